@@ -0,0 +1,128 @@
+"""Benchmark e regressão offline dos extratores (extractors.py) sobre as fixtures.
+
+Para cada site e cada backend de parsing instalado (html.parser, lxml, selectolax)
+mede anúncios/s e pico de memória, e confere os IDs extraídos com
+fixtures/expected_ids.json.
+
+Uso:
+    python bench_parsers.py [--iterations 20] [--sites riviera,iz]
+    python bench_parsers.py --update-expected   # aceita a saída atual como referência
+    python bench_parsers.py --record            # regrava as fixtures a partir dos sites reais
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+from extractors import available_backends, extract_listings
+from sites import SITES
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+EXPECTED_FILE = os.path.join(FIXTURES_DIR, "expected_ids.json")
+ADS_JSON = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ads.json")
+
+# Um site do registro por fixture (as duas buscas da OLX compartilham "olx")
+FIXTURE_SITES = {}
+for _site in SITES:
+    FIXTURE_SITES.setdefault(_site["fixture"], _site)
+
+def load_fixture(site):
+    path = os.path.join(FIXTURES_DIR, f"{site}.html")
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            return f.read()
+    if site == "olx":
+        # Sem página gravada, monta uma a partir do ads.json (o mesmo payload do __NEXT_DATA__)
+        with open(ADS_JSON, encoding="utf-8") as f:
+            ads = json.load(f)
+        next_data = json.dumps({"props": {"pageProps": {"ads": ads}}}, ensure_ascii=False)
+        return f'<!DOCTYPE html><html><head><title>OLX</title></head><body><div id="__next"></div><script id="__NEXT_DATA__" type="application/json">{next_data}</script></body></html>'
+    return None
+
+def load_expected():
+    if not os.path.exists(EXPECTED_FILE):
+        return {}
+    with open(EXPECTED_FILE, encoding="utf-8") as f:
+        return json.load(f)
+
+def measure(site, html, backend, iterations):
+    extract_listings(html, site, backend)  # aquecimento (imports, caches de seletor)
+    started = time.perf_counter()
+    for _ in range(iterations):
+        ads = extract_listings(html, site, backend)
+    elapsed = time.perf_counter() - started
+    tracemalloc.start()
+    extract_listings(html, site, backend)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return ads, elapsed / iterations, peak
+
+async def record(sites):
+    from playwright.async_api import async_playwright
+    from waits import wait_until_ready
+
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+        context = await browser.new_context(user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
+        page = await context.new_page()
+        for site in sites:
+            config = FIXTURE_SITES[site]
+            try:
+                await page.goto(config["url"], wait_until="domcontentloaded", timeout=60000)
+                await wait_until_ready(page, config["name"], config["ready"])
+                with open(os.path.join(FIXTURES_DIR, f"{site}.html"), "w", encoding="utf-8") as f:
+                    f.write(await page.content())
+                print(f"Gravado: fixtures/{site}.html")
+            except Exception as e:
+                print(f"Erro ao gravar {site}: {e}")
+        await browser.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--sites", default=",".join(FIXTURE_SITES), help="lista separada por vírgula")
+    parser.add_argument("--backends", default=None, help="padrão: todos os instalados")
+    parser.add_argument("--update-expected", action="store_true")
+    parser.add_argument("--record", action="store_true")
+    args = parser.parse_args()
+    sites = [s for s in args.sites.split(",") if s]
+
+    if args.record:
+        asyncio.run(record(sites))
+        args.update_expected = True
+
+    backends = args.backends.split(",") if args.backends else available_backends()
+    expected = load_expected()
+    failures = 0
+    print(f"{'site':<10} {'backend':<12} {'ads':>5} {'ms/página':>10} {'ads/s':>10} {'pico KB':>9}  ok")
+    for site in sites:
+        html = load_fixture(site)
+        if html is None:
+            print(f"{site:<10} (sem fixture)")
+            continue
+        reference = None
+        # O __NEXT_DATA__ não monta DOM: o backend não muda nada, mede uma vez só
+        config = FIXTURE_SITES[site]
+        for backend in (backends[:1] if config["kind"] == "next_data" else backends):
+            ads, per_page, peak = measure(config, html, backend, args.iterations)
+            ids = [str(ad["id"]) for ad in ads]
+            if reference is None:
+                reference = ids
+            ok = ids == reference and (site not in expected or ids == expected[site] or args.update_expected)
+            failures += not ok
+            rate = len(ads) / per_page if per_page else 0
+            print(f"{site:<10} {backend:<12} {len(ads):>5} {per_page * 1000:>10.2f} {rate:>10.0f} {peak / 1024:>9.0f}  {'ok' if ok else 'DIVERGE'}")
+        if args.update_expected and reference is not None:
+            expected[site] = reference
+
+    if args.update_expected:
+        with open(EXPECTED_FILE, "w", encoding="utf-8") as f:
+            json.dump(expected, f, ensure_ascii=False, indent=2)
+        print(f"Referência atualizada: {EXPECTED_FILE}")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Micro-benchmark da persistência: save_new_imoveis antigo x ImovelStore em lote.
+
+Uso: python bench_storage.py [--rows 100000] [--batch 200] [--rounds 10]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from datetime import datetime
+
+from storage import ImovelStore
+
+SITES = ["olx", "riviera", "iz", "adimov"]
+
+def create_db(db_file, rows):
+    conn = sqlite3.connect(db_file)
+    conn.execute('''
+        CREATE TABLE imoveis (
+            id TEXT PRIMARY KEY, title TEXT, price TEXT, url TEXT, category TEXT, location TEXT,
+            source_site TEXT DEFAULT 'olx', ad_type TEXT DEFAULT 'owner', date_added TIMESTAMP,
+            notified BOOLEAN DEFAULT 0, contacted BOOLEAN DEFAULT 0,
+            price_cents INTEGER, area_m2 REAL, bedrooms INTEGER, neighbourhood TEXT, list_time INTEGER, raw BLOB
+        )
+    ''')
+    conn.execute("CREATE TABLE crawl_state (key TEXT PRIMARY KEY, value TEXT)")
+    now = datetime.now().isoformat(sep=" ")
+    conn.executemany(
+        "INSERT INTO imoveis (id, title, price, url, category, location, source_site, ad_type, date_added, notified) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 1)",
+        ((str(i), f"Casa {i}", f"R$ {i * 1000}", f"https://example.com/{i}", "Casas", "São Sebastião", "olx", "owner", now) for i in range(rows)))
+    conn.commit()
+    conn.close()
+
+def legacy_save(db_file, ads, source_site, ad_type):
+    # Cópia da implementação anterior: 1 conexão por chamada, SELECT + INSERT por anúncio
+    conn = sqlite3.connect(db_file)
+    cursor = conn.cursor()
+    new_ads = []
+    for ad in ads:
+        list_id = str(ad.get("id"))
+        cursor.execute("SELECT id FROM imoveis WHERE id = ?", (list_id,))
+        if cursor.fetchone() is None:
+            cursor.execute('''
+                INSERT INTO imoveis (id, title, price, url, category, location, source_site, ad_type, date_added, notified)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 0)
+            ''', (list_id, ad.get("title"), ad.get("price"), ad.get("url"), ad.get("category"), ad.get("location"), source_site, ad_type, datetime.now().isoformat(sep=" ")))
+            new_ads.append(ad)
+    conn.commit()
+    conn.close()
+    return new_ads
+
+def make_batches(rows, batch, rounds, seed=42):
+    # Metade de cada lote já existe no banco, metade é inédita (como numa rodada real)
+    rng = random.Random(seed)
+    next_id = rows
+    batches = []
+    for _ in range(rounds):
+        ads = [{"id": rng.randrange(rows)} for _ in range(batch // 2)]
+        ads += [{"id": next_id + i} for i in range(batch - batch // 2)]
+        next_id += batch
+        for ad in ads:
+            ad.update({"title": f"Casa {ad['id']}", "price": "R$ 500.000", "url": f"https://example.com/{ad['id']}", "category": "Casas", "location": "Enseada"})
+        batches.append(ads)
+    return batches
+
+def bench(label, save, batches):
+    started = time.perf_counter()
+    inserted = sum(len(save(ads)) for ads in batches)
+    elapsed = time.perf_counter() - started
+    total = sum(len(ads) for ads in batches)
+    print(f"{label:<10} {elapsed * 1000:9.1f} ms  {total / elapsed:10.0f} anúncios/s  ({inserted} novos)")
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000, help="linhas sintéticas pré-existentes em imoveis")
+    parser.add_argument("--batch", type=int, default=200, help="anúncios raspados por chamada")
+    parser.add_argument("--rounds", type=int, default=10, help="chamadas de save por cenário")
+    args = parser.parse_args()
+
+    batches = make_batches(args.rows, args.batch, args.rounds)
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_db = os.path.join(tmp, "legacy.db")
+        store_db = os.path.join(tmp, "store.db")
+        create_db(legacy_db, args.rows)
+        create_db(store_db, args.rows)
+        print(f"imoveis com {args.rows} linhas, {args.rounds} lotes de {args.batch} anúncios")
+
+        legacy = bench("legado", lambda ads: legacy_save(legacy_db, ads, "olx", "owner"), batches)
+        store = ImovelStore(store_db)
+        new = bench("store", lambda ads: store.save_new(ads, "olx", "owner"), batches)
+        store.close()
+        print(f"speedup: {legacy / new:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""Pool gerenciado do Chromium: um contexto quente por site, reciclado e recuperado.
+
+    pool = BrowserPool(playwright, context_options={"user_agent": ...})
+    async with pool.lease(site) as (page, resource_stats):
+        ...
+    await pool.close()
+
+- O contexto de cada site é reaproveitado entre rodadas (daemon) e reciclado depois
+  de BROWSER_MAX_NAVIGATIONS navegações, se a página travar/cair ou após qualquer erro.
+- Se a soma do RSS do Chromium passar de BROWSER_MAX_RSS_MB, os contextos ociosos são
+  fechados; se ainda assim não baixar, o browser é relançado quando ficar ocioso.
+- Browser desconectado (crash) é relançado na próxima lease.
+- stats[site] guarda runs/ok/failed/retries/crashes/recycles, também enviados ao metrics.
+"""
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from datetime import datetime
+
+from metrics import count, span
+from resource_policy import install_resource_policy
+
+BROWSER_MAX_NAVIGATIONS = int(os.environ.get("BROWSER_MAX_NAVIGATIONS", "50"))
+BROWSER_MAX_RSS_MB = int(os.environ.get("BROWSER_MAX_RSS_MB", "1500"))
+
+def chromium_rss_mb():
+    """RSS (MB) somado dos processos descendentes deste Python (driver, Chromium, renderers).
+
+    Lido do /proc; fora do Linux devolve None e o teto de memória fica desligado.
+    """
+    if not os.path.isdir("/proc"):
+        return None
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # O nome do processo pode ter espaços/parênteses: o ppid vem depois do último ")"
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(entry)
+    total_kb = 0
+    stack = list(children.get(os.getpid(), []))
+    while stack:
+        pid = stack.pop()
+        stack.extend(children.get(int(pid), []))
+        try:
+            with open(f"/proc/{pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total_kb += int(line.split()[1])
+                        break
+        except (OSError, ValueError):
+            continue
+    return total_kb / 1024
+
+class BrowserPool:
+    """Um browser compartilhado e um contexto (com sua página) por site."""
+
+    def __init__(self, playwright, context_options=None, launch_options=None):
+        self.playwright = playwright
+        self.context_options = context_options or {}
+        self.launch_options = launch_options or {"headless": True}
+        self.browser = None
+        self.lock = asyncio.Lock()
+        self.slots = {}
+        self.active = set()
+        self.stats = {}
+        self.relaunch_when_idle = False
+
+    def site_stats(self, name):
+        return self.stats.setdefault(name, {"runs": 0, "ok": 0, "failed": 0, "retries": 0, "crashes": 0, "recycles": 0})
+
+    def record(self, name, ok, retry=False):
+        stats = self.site_stats(name)
+        stats["runs"] += 1
+        stats["ok" if ok else "failed"] += 1
+        count("site_ok" if ok else "site_failed", site=name)
+        if retry:
+            stats["retries"] += 1
+            count("site_retries", site=name)
+
+    async def ensure_browser(self):
+        async with self.lock:
+            if self.browser is None or not self.browser.is_connected():
+                if self.browser is not None:
+                    count("browser_restarts")
+                    print(f"[{datetime.now().strftime('%H:%M:%S')}] Browser desconectado, relançando.")
+                    # Os contextos morreram junto com o processo
+                    self.slots.clear()
+                with span("browser_launch"):
+                    self.browser = await self.playwright.chromium.launch(**self.launch_options)
+            return self.browser
+
+    async def _open_slot(self, site):
+        browser = await self.ensure_browser()
+        context = await browser.new_context(**self.context_options)
+        resources = await install_resource_policy(context, site.get("resources"))
+        page = await context.new_page()
+        slot = {"context": context, "page": page, "resources": resources, "navigations": 0, "crashed": False}
+
+        def on_navigated(frame):
+            if frame.parent_frame is None:
+                slot["navigations"] += 1
+
+        def on_crash(_):
+            slot["crashed"] = True
+
+        page.on("framenavigated", on_navigated)
+        page.on("crash", on_crash)
+        return slot
+
+    async def _close_slot(self, name, reason):
+        slot = self.slots.pop(name, None)
+        if slot is None:
+            return
+        self.site_stats(name)["recycles"] += 1
+        count("context_recycles", site=name)
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] Reciclando contexto de {name} ({reason}).")
+        try:
+            await slot["context"].close()
+        except Exception:
+            pass
+
+    def broken(self, name):
+        """True se a página do site caiu (crash do renderer, página fechada ou browser fora do ar)."""
+        slot = self.slots.get(name)
+        return (slot is None or slot["crashed"] or slot["page"].is_closed()
+                or self.browser is None or not self.browser.is_connected())
+
+    @asynccontextmanager
+    async def lease(self, site):
+        """Empresta a página do site; em erro o contexto é descartado (e recriado na próxima)."""
+        name = site["name"]
+        # Ativo antes de abrir o contexto: o check_memory de outra lease que termina enquanto
+        # este abre não pode relançar (fechar) o browser no meio do caminho
+        self.active.add(name)
+        try:
+            slot = self.slots.get(name)
+            if slot is not None:
+                if self.broken(name):
+                    self.site_stats(name)["crashes"] += 1
+                    count("crashes", site=name)
+                    await self._close_slot(name, "página ou browser caiu")
+                elif slot["navigations"] >= BROWSER_MAX_NAVIGATIONS:
+                    await self._close_slot(name, f"{slot['navigations']} navegações")
+            if name not in self.slots:
+                with span("new_context", name):
+                    self.slots[name] = await self._open_slot(site)
+            slot = self.slots[name]
+            # Estatísticas de recursos valem por lease (o dict é o mesmo que os handlers alteram)
+            resources = slot["resources"]
+            resources.update({"requests": 0, "blocked": 0, "bytes_loaded": 0})
+            resources["blocked_by_type"].clear()
+            try:
+                yield slot["page"], resources
+            except BaseException:
+                if self.broken(name):
+                    self.site_stats(name)["crashes"] += 1
+                    count("crashes", site=name)
+                await self._close_slot(name, "erro")
+                raise
+        finally:
+            self.active.discard(name)
+            await self.check_memory()
+
+    async def check_memory(self):
+        """Aplica o teto de RSS: fecha contextos ociosos e, se preciso, relança o browser ocioso."""
+        rss = chromium_rss_mb()
+        if rss is None:
+            return
+        if rss < BROWSER_MAX_RSS_MB and not self.relaunch_when_idle:
+            return
+        if rss >= BROWSER_MAX_RSS_MB:
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] Chromium com {rss:.0f} MB (teto {BROWSER_MAX_RSS_MB} MB).")
+            for name in [n for n in self.slots if n not in self.active]:
+                await self._close_slot(name, "teto de memória")
+            rss = chromium_rss_mb()
+            self.relaunch_when_idle = rss >= BROWSER_MAX_RSS_MB
+        if self.relaunch_when_idle and not self.active:
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] Relançando o Chromium para liberar memória.")
+            count("browser_recycles")
+            self.relaunch_when_idle = False
+            await self.close()
+
+    def log_stats(self):
+        for name, stats in sorted(self.stats.items()):
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] Pool {name}: {stats['ok']}/{stats['runs']} ok, "
+                  f"{stats['failed']} falhas, {stats['retries']} retries, {stats['crashes']} crashes, "
+                  f"{stats['recycles']} contextos reciclados.")
+
+    async def close(self):
+        # Sob o lock: não fecha o browser no meio de um lançamento do ensure_browser
+        async with self.lock:
+            for name in list(self.slots):
+                slot = self.slots.pop(name)
+                try:
+                    await slot["context"].close()
+                except Exception:
+                    pass
+            if self.browser is not None:
+                try:
+                    await self.browser.close()
+                except Exception:
+                    pass
+                self.browser = None
@@ -0,0 +1,85 @@
+"""Conferência offline do modo segments (segments.py).
+
+Monta uma base sintética, liga start_capture() e grava duas rodadas seguidas dos mesmos
+anúncios pelo mesmo caminho do persist_site (save_new, record_snapshots, index_listings,
+set_state) mais save_drafts: a segunda rodada passa por UPSERTs em linhas já anotadas.
+Depois aplica o segmento numa cópia da base de antes da captura e compara as tabelas
+versionadas. Sai com código 1 se algo falhar.
+
+Uso: python check_segments.py [--ads 200]
+"""
+import argparse
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+
+from dedup import ensure_dedup_index, index_listings
+from drafting import save_drafts
+from history import record_snapshots
+from migrations import migrate
+from segments import TRACKED_TABLES, apply_segments, start_capture, write_segment
+from storage import ImovelStore
+
+def make_ads(count, round_no):
+    now = int(time.time())
+    ads = []
+    for i in range(count):
+        # Na segunda rodada parte dos preços cai e alguns anúncios sobem
+        price = f"R$ {500_000 + i * 1000 - (5000 if round_no and i % 3 == 0 else 0):,}".replace(",", ".")
+        ads.append({"id": str(10_000 + i), "title": f"Casa {i} com {i % 5 + 1} quartos", "price": price,
+                    "url": f"https://example.com/{i}", "location": "São Sebastião, Enseada", "category": "Casas",
+                    "raw": {"listId": 10_000 + i, "priceValue": price, "origListTime": now - i * 600, "lastBumpAgeSecs": 7200 * round_no if i % 4 == 0 else 0}})
+    return ads
+
+def persist_round(store, ads, round_no):
+    new_ads = store.save_new(ads, "olx", "owner")
+    record_snapshots(store.conn, ads, "olx", "owner")
+    index_listings(store.conn, [str(ad["id"]) for ad in new_ads])
+    store.set_state("olx:owner:high_water", max(ad["raw"]["origListTime"] for ad in ads) + round_no)
+    save_drafts(store.conn, [(str(ad["id"]), "k", f"rascunho {round_no}", False) for ad in ads[:20]], "check")
+
+def table_rows(conn, table):
+    return sorted(conn.execute(f"SELECT * FROM {table}").fetchall(), key=repr)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ads", type=int, default=200)
+    args = parser.parse_args()
+
+    failures = []
+    with tempfile.TemporaryDirectory() as tmp:
+        db_file, base_file, seg_dir = (os.path.join(tmp, name) for name in ("live.db", "base.db", "segments"))
+        store = ImovelStore(db_file)
+        migrate(store.conn)
+        ensure_dedup_index(store.conn)
+        store.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        shutil.copy(db_file, base_file)
+
+        start_capture(store.conn)
+        for round_no in (0, 1):
+            try:
+                persist_round(store, make_ads(args.ads, round_no), round_no)
+                print(f"rodada {round_no + 1}: ok")
+            except sqlite3.Error as e:
+                failures.append(f"rodada {round_no + 1}: {e}")
+        if write_segment(store.conn, seg_dir) is None:
+            failures.append("nenhum segmento gravado")
+
+        base = sqlite3.connect(base_file)
+        apply_segments(base, seg_dir)
+        for table in TRACKED_TABLES:
+            if table_rows(base, table) != table_rows(store.conn, table):
+                failures.append(f"{table}: base + segmento difere da base viva")
+        base.close()
+        store.close()
+
+    for failure in failures:
+        print(f"FALHA {failure}")
+    print("segments ok" if not failures else f"{len(failures)} falha(s)")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""Modo serviço: browser e conexão SQLite sempre quentes, cada site no seu intervalo.
+
+    python daemon.py
+
+Cada site ativo (sites.py) roda num laço próprio: raspa, grava, notifica e dorme
+"interval" segundos (± DAEMON_JITTER, para os portais não verem um relógio exato).
+Depois de falha/timeout o intervalo dobra a cada erro seguido, até DAEMON_MAX_BACKOFF.
+O Chromium é gerenciado pelo browser_pool (contexto quente por site, reciclagem e
+recuperação de crash). SIGTERM/SIGINT param os laços, esperam a raspagem em curso
+(até DAEMON_SHUTDOWN_GRACE segundos) e fecham browser e banco. Feito para
+systemd/docker; o cron diário do GitHub Actions continua usando olx_scraper.py
+(uma rodada e sai).
+"""
+import asyncio
+import os
+import random
+import signal
+from datetime import datetime
+
+from playwright.async_api import async_playwright
+
+from browser_pool import BrowserPool
+from dedup import ensure_dedup_index
+from metrics import count, reset as reset_metrics, span, write_report
+from olx_scraper import (MAX_CONCURRENT_PAGES, SITE_TIMEOUT, USER_AGENT, checkpoint_storage, close_store,
+                         get_store, init_db, notify_all, persist_site, scrape_with_store)
+from scheduler import run_site
+from sites import enabled_sites
+
+# Variação aleatória do intervalo (0.1 = ±10%)
+DAEMON_JITTER = float(os.environ.get("DAEMON_JITTER", "0.1"))
+# Teto do intervalo depois de erros seguidos (segundos)
+DAEMON_MAX_BACKOFF = int(os.environ.get("DAEMON_MAX_BACKOFF", "3600"))
+# De quanto em quanto tempo o relatório de métricas é gravado (e zerado)
+DAEMON_REPORT_INTERVAL = int(os.environ.get("DAEMON_REPORT_INTERVAL", "900"))
+# Quanto esperamos a raspagem em curso terminar depois do SIGTERM
+DAEMON_SHUTDOWN_GRACE = int(os.environ.get("DAEMON_SHUTDOWN_GRACE", "60"))
+
+def site_interval(site):
+    env = f"SITE_INTERVAL_{site['name'].upper().replace('-', '_')}"
+    return int(os.environ.get(env) or site["interval"])
+
+def next_delay(site, failures):
+    """Intervalo até a próxima raspagem: base do site, dobrada por erro seguido, com jitter."""
+    delay = site_interval(site)
+    if failures:
+        delay = min(delay * 2 ** failures, max(DAEMON_MAX_BACKOFF, delay))
+    return delay * random.uniform(1 - DAEMON_JITTER, 1 + DAEMON_JITTER)
+
+class ScraperDaemon:
+    """Mantém o pool do browser e o store abertos e agenda cada site no seu intervalo."""
+
+    def __init__(self, sites):
+        self.sites = sites
+        self.stop = asyncio.Event()
+        self.semaphore = asyncio.Semaphore(MAX_CONCURRENT_PAGES)
+        self.notify_lock = asyncio.Lock()
+        self.pool = None
+
+    async def sleep(self, seconds):
+        """Dorme, mas acorda na hora se pedirem para parar. Retorna True se é para parar."""
+        try:
+            await asyncio.wait_for(self.stop.wait(), timeout=seconds)
+        except asyncio.TimeoutError:
+            pass
+        return self.stop.is_set()
+
+    async def site_loop(self, site):
+        failures = 0
+        while not self.stop.is_set():
+            try:
+                _, ads = await run_site(self.pool, self.semaphore, site, scrape_with_store, SITE_TIMEOUT)
+            except Exception as e:
+                print(f"[{datetime.now().strftime('%H:%M:%S')}] Erro crítico {site['label']}: {e}")
+                ads = None
+            if ads is None:
+                failures += 1
+                count("daemon_failures", site=site["name"])
+            else:
+                failures = 0
+                persist_site(site, ads)
+                # Um envio por vez: duas buscas terminando juntas não podem notificar o mesmo anúncio
+                async with self.notify_lock:
+                    await notify_all()
+            delay = next_delay(site, failures)
+            suffix = f" (backoff, {failures} erros seguidos)" if failures else ""
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] {site['label']}: próxima raspagem em {delay / 60:.1f} min{suffix}.")
+            if await self.sleep(delay):
+                break
+
+    async def report_loop(self):
+        while not await self.sleep(DAEMON_REPORT_INTERVAL):
+            self.pool.log_stats()
+            write_report()
+            reset_metrics()
+            # No modo segments, o que mudou vira um segmento a cada relatório
+            checkpoint_storage()
+
+    def request_stop(self):
+        if not self.stop.is_set():
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] Sinal de parada recebido, encerrando após as raspagens em curso...")
+            self.stop.set()
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            try:
+                loop.add_signal_handler(sig, self.request_stop)
+            except NotImplementedError:
+                pass  # Windows: só Ctrl+C (KeyboardInterrupt)
+
+        with span("init_db"):
+            init_db()
+            ensure_dedup_index(get_store().conn)
+        # Mesmo se algo escapar, o que já foi gravado vira segmento e o WAL é fechado
+        try:
+            async with async_playwright() as p:
+                # Contextos quentes por site, reciclados por navegações/memória, com recuperação de crash
+                self.pool = BrowserPool(p, context_options={"user_agent": USER_AGENT})
+                await self.pool.ensure_browser()
+                print(f"[{datetime.now().strftime('%H:%M:%S')}] Daemon no ar: " +
+                      ", ".join(f"{site['label']} a cada {site_interval(site) / 60:.0f} min" for site in self.sites))
+                loops = [asyncio.create_task(self.site_loop(site)) for site in self.sites]
+                reporter = asyncio.create_task(self.report_loop())
+                await self.stop.wait()
+                # asyncio.wait não aceita lista vazia
+                _, pending = await asyncio.wait(loops, timeout=DAEMON_SHUTDOWN_GRACE) if loops else (set(), set())
+                for task in pending:
+                    task.cancel()
+                await asyncio.gather(*pending, reporter, return_exceptions=True)
+                self.pool.log_stats()
+                await self.pool.close()
+        finally:
+            write_report()
+            close_store()
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] Daemon encerrado.")
+
+async def main():
+    print(f"--- Início do Daemon de Monitoramento: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} ---")
+    sites = enabled_sites()
+    if not sites:
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] Nenhum site ativo (veja SITES_ENABLED / SITES_DISABLED), nada a fazer.")
+        return
+    reset_metrics()
+    await ScraperDaemon(sites).run()
+
+if __name__ == "__main__":
+    asyncio.run(main())
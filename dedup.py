@@ -0,0 +1,201 @@
+import math
+import random
+import re
+import unicodedata
+import zlib
+from datetime import datetime
+
+from storage import select_in
+
+# MinHash de 32 permutações em 8 bandas de 4 linhas: títulos com Jaccard ~0.5+ colidem
+# em pelo menos uma banda com alta probabilidade.
+NUM_PERM = 32
+BANDS = 8
+ROWS = NUM_PERM // BANDS
+_PRIME = (1 << 61) - 1
+_rng = random.Random(20240229)
+_PERMS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+
+# Faixas logarítmicas: ~10% de largura para preço, ~15% para área
+PRICE_BAND = math.log(1.10)
+AREA_BAND = math.log(1.15)
+
+# Critérios de confirmação de um par candidato
+MAX_PRICE_DIFF = 0.03
+MAX_AREA_DIFF = 0.05
+MIN_TITLE_JACCARD = 0.5
+MIN_TITLE_JACCARD_WITH_AREA = 0.2
+# Sem área e com bairro desconhecido (imobiliárias), o título precisa ter ao menos
+# tantas palavras em comum fora as genéricas (tipo de imóvel, cômodos, números)
+MIN_SPECIFIC_TOKENS = 2
+GENERIC_TOKENS = {
+    "casa", "casas", "apartamento", "apto", "ap", "terreno", "lote", "sobrado", "chale", "kitnet", "cobertura", "imovel",
+    "quarto", "quartos", "dormitorio", "dormitorios", "dorm", "dorms", "suite", "suites", "banheiro", "banheiros", "vaga", "vagas",
+}
+
+STOPWORDS = {
+    "a", "o", "e", "de", "da", "do", "das", "dos", "em", "no", "na", "nos", "nas", "com", "para", "por", "um", "uma",
+    "sao", "sebastiao", "sp", "venda", "vende", "vendo", "se", "imovel", "imoveis", "otimo", "otima", "lindo", "linda",
+    "excelente", "oportunidade", "r", "m", "m2",
+}
+
+def title_tokens(title):
+    """Tokens normalizados do título (sem acento, minúsculos, sem stopwords)."""
+    text = unicodedata.normalize("NFKD", title or "").encode("ascii", "ignore").decode().lower()
+    return {t for t in re.findall(r"[a-z0-9]+", text) if t not in STOPWORDS}
+
+def minhash(tokens):
+    hashes = [zlib.crc32(t.encode()) for t in tokens] or [0]
+    return [min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMS]
+
+def _band(value, width):
+    return int(math.log(value) / width) if value else None
+
+def _neighbourhood_key(neighbourhood):
+    return unicodedata.normalize("NFKD", neighbourhood or "").encode("ascii", "ignore").decode().lower().strip() or "-"
+
+def blocking_keys(listing, neighbours=False):
+    """Chaves LSH (título + faixa de preço) e de bloqueio (preço + área + bairro).
+
+    Com neighbours=True inclui as faixas vizinhas de preço/área, para a consulta não
+    perder pares que caíram logo do outro lado de uma fronteira de faixa.
+    """
+    price_band = _band(listing["price_cents"], PRICE_BAND)
+    area_band = _band(listing["area_m2"], AREA_BAND)
+    price_bands = [price_band] if price_band is None or not neighbours else [price_band - 1, price_band, price_band + 1]
+    area_bands = [area_band] if area_band is None or not neighbours else [area_band - 1, area_band, area_band + 1]
+    keys = []
+    signature = minhash(title_tokens(listing["title"]))
+    for band in range(BANDS):
+        band_hash = zlib.crc32(repr(signature[band * ROWS:(band + 1) * ROWS]).encode())
+        keys.extend(f"t{band}:{band_hash}:{p}" for p in price_bands)
+    if price_band is not None and area_band is not None:
+        hood = _neighbourhood_key(listing["neighbourhood"])
+        keys.extend(f"pa:{p}:{a}:{hood}" for p in price_bands for a in area_bands)
+    return keys
+
+def _close(a, b, tolerance):
+    return abs(a - b) <= tolerance * max(a, b)
+
+def is_duplicate(a, b):
+    """Confirma um par candidato de portais diferentes: preço (±3%) e bairro compatíveis,
+    mais área (±5%) com algo do título em comum, ou título parecido quando falta área.
+
+    Bairro desconhecido não conta como compatível de graça: sem área, o título precisa
+    de MIN_SPECIFIC_TOKENS palavras em comum que não sejam genéricas.
+    """
+    if a["source_site"] == b["source_site"]:
+        return False
+    if not a["price_cents"] or not b["price_cents"] or not _close(a["price_cents"], b["price_cents"], MAX_PRICE_DIFF):
+        return False
+    hood_a, hood_b = _neighbourhood_key(a["neighbourhood"]), _neighbourhood_key(b["neighbourhood"])
+    hood_known = "-" not in (hood_a, hood_b)
+    if hood_known and hood_a != hood_b:
+        return False
+    tokens_a, tokens_b = title_tokens(a["title"]), title_tokens(b["title"])
+    union = tokens_a | tokens_b
+    jaccard = len(tokens_a & tokens_b) / len(union) if union else 0
+    # Área batendo é um sinal forte: aí basta o título ter alguma coisa em comum
+    if a["area_m2"] and b["area_m2"]:
+        return _close(a["area_m2"], b["area_m2"], MAX_AREA_DIFF) and jaccard >= MIN_TITLE_JACCARD_WITH_AREA
+    if not hood_known:
+        # "Casa à venda em São Sebastião" x "Casa em São Sebastião" viram só {"casa"}
+        specific = [t for t in tokens_a & tokens_b if t not in GENERIC_TOKENS and not t.isdigit()]
+        if len(specific) < MIN_SPECIFIC_TOKENS:
+            return False
+    return jaccard >= MIN_TITLE_JACCARD
+
+def init_dedup(cursor):
+    # Índice invertido chave -> anúncio (consultado por SQL, sem comparar todos os pares)
+    cursor.execute("CREATE TABLE IF NOT EXISTS dedup_keys (key TEXT, listing_id TEXT, PRIMARY KEY (key, listing_id)) WITHOUT ROWID")
+    # Anúncios do mesmo imóvel em portais diferentes compartilham o cluster_id
+    cursor.execute("CREATE TABLE IF NOT EXISTS listing_duplicates (listing_id TEXT PRIMARY KEY, cluster_id TEXT, matched_at TIMESTAMP)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_duplicates_cluster ON listing_duplicates (cluster_id)")
+
+def _load_listings(conn, ids):
+    columns = ("id", "title", "source_site", "price_cents", "area_m2", "neighbourhood")
+    rows = select_in(conn, f"SELECT {', '.join(columns)} FROM imoveis WHERE id IN ({{placeholders}})", ids)
+    return {row[0]: dict(zip(columns, row)) for row in rows}
+
+def index_listings(conn, ids):
+    """Indexa os anúncios informados e liga os que forem duplicatas de outros portais.
+
+    Cada anúncio novo gera ~30 chaves e é comparado só com quem colide nelas.
+    Retorna o número de anúncios ligados a um cluster.
+    """
+    listings = _load_listings(conn, ids)
+    now = datetime.now().isoformat(sep=" ")
+    linked = 0
+    with conn:
+        for listing in listings.values():
+            keys = blocking_keys(listing, neighbours=True)
+            placeholders = ",".join("?" * len(keys))
+            candidate_ids = {row[0] for row in conn.execute(f"SELECT DISTINCT listing_id FROM dedup_keys WHERE key IN ({placeholders})", keys)}
+            candidate_ids.discard(listing["id"])
+            matches = [c for c in _load_listings(conn, candidate_ids).values() if is_duplicate(listing, c)]
+            if matches:
+                # Liga só ao candidato mais próximo em preço (sem fundir clusters por transitividade)
+                best = min(matches, key=lambda m: abs(m["price_cents"] - listing["price_cents"]))
+                row = conn.execute("SELECT cluster_id FROM listing_duplicates WHERE listing_id = ?", (best["id"],)).fetchone()
+                cluster_id = row[0] if row else best["id"]
+                conn.executemany("INSERT OR IGNORE INTO listing_duplicates (listing_id, cluster_id, matched_at) VALUES (?, ?, ?)",
+                                 [(best["id"], cluster_id, now), (listing["id"], cluster_id, now)])
+                linked += 1
+            conn.executemany("INSERT OR IGNORE INTO dedup_keys (key, listing_id) VALUES (?, ?)",
+                             [(key, listing["id"]) for key in blocking_keys(listing)])
+    return linked
+
+def ensure_dedup_index(conn):
+    """Indexa (em ordem de chegada) os anúncios que ainda não têm chaves em dedup_keys.
+
+    Na primeira execução é o histórico inteiro; no modo segments, dedup_keys não vai
+    para os segmentos e as linhas de imoveis que chegam por eles são indexadas aqui.
+    """
+    ids = [row[0] for row in conn.execute('''
+        SELECT id FROM imoveis WHERE id IN (SELECT id FROM imoveis EXCEPT SELECT listing_id FROM dedup_keys)
+        ORDER BY date_added
+    ''')]
+    if ids:
+        linked = index_listings(conn, ids)
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] Dedup: {len(ids)} anúncios indexados, {linked} duplicatas ligadas.")
+
+def collapse_duplicates(conn, ads):
+    """Agrupa os anúncios pendentes de notificação pelo cluster de duplicatas.
+
+    Devolve (para_enviar, silenciosos): cada anúncio enviado leva em "duplicates" as
+    cópias de outros portais da mesma leva; cópias de imóveis já notificados antes
+    vão para silenciosos (marcados como notificados sem nova mensagem).
+
+    Anúncios de proprietário (ad_type "owner") são sempre enviados, na mensagem
+    deles: se o imóvel já apareceu em outro anúncio, ele vai em "seen_before".
+    """
+    clusters = dict(select_in(conn, "SELECT listing_id, cluster_id FROM listing_duplicates WHERE listing_id IN ({placeholders})",
+                              [ad["id"] for ad in ads]))
+    if not clusters:
+        return ads, []
+    # Um anúncio já notificado por cluster (o que é citado no alerta do proprietário)
+    already = {row[0]: {"source_site": row[1], "url": row[2]} for row in select_in(conn, '''
+        SELECT d.cluster_id, i.source_site, i.url FROM listing_duplicates d JOIN imoveis i ON i.id = d.listing_id
+        WHERE i.notified = 1 AND d.cluster_id IN ({placeholders})
+    ''', set(clusters.values()))}
+    to_send, silent, leaders = [], [], {}
+    for ad in ads:
+        cluster_id = clusters.get(ad["id"])
+        if cluster_id is None:
+            to_send.append(ad)
+        elif ad.get("ad_type") == "owner":
+            # Lead de proprietário nunca é engolido por uma cópia de outro portal
+            earlier = already.get(cluster_id) or leaders.get(cluster_id)
+            if earlier:
+                to_send.append(dict(ad, seen_before={"source_site": earlier["source_site"], "url": earlier["url"]}))
+            else:
+                leaders[cluster_id] = dict(ad, duplicates=[])
+                to_send.append(leaders[cluster_id])
+        elif cluster_id in already:
+            silent.append(ad["id"])
+        elif cluster_id in leaders:
+            leaders[cluster_id]["duplicates"].append(ad)
+        else:
+            leaders[cluster_id] = dict(ad, duplicates=[])
+            to_send.append(leaders[cluster_id])
+    return to_send, silent
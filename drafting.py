@@ -0,0 +1,196 @@
+"""Pipeline de rascunhos de contato (IA) para anúncios de proprietários.
+
+Pega todos os proprietários pendentes (até DRAFT_LIMIT), agrupa os quase idênticos pela
+chave de rascunho (título normalizado + preço/área/quartos/bairro), reaproveita rascunhos
+já gerados para a mesma chave e chama o modelo só para o que falta, com no máximo
+DRAFT_CONCURRENCY chamadas simultâneas e retry com backoff. Os rascunhos ficam na
+tabela drafts e os anúncios são marcados contacted=1 em lotes.
+
+AI_MODEL=fake usa FakeDraftModel (local, determinístico) para rodar offline:
+
+    AI_MODEL=fake python drafting.py --db /tmp/copia.db --limit 500
+"""
+import argparse
+import asyncio
+import hashlib
+import os
+import random
+import time
+from datetime import datetime
+
+from dedup import title_tokens
+from metrics import count, span
+from retry import backoff_delay
+from storage import select_in
+
+# "gemini" (AIContactLogic, do ai_contact_logic.py) ou "fake" (local, para testes)
+AI_MODEL = os.environ.get("AI_MODEL", "gemini")
+DRAFT_CONCURRENCY = int(os.environ.get("DRAFT_CONCURRENCY", "4"))
+DRAFT_MAX_RETRIES = int(os.environ.get("DRAFT_MAX_RETRIES", "4"))
+DRAFT_TIMEOUT = int(os.environ.get("DRAFT_TIMEOUT", "60"))
+# Proprietários pendentes processados por rodada
+DRAFT_LIMIT = int(os.environ.get("DRAFT_LIMIT", "1000"))
+# Rascunhos gravados por transação
+DRAFT_COMMIT_EVERY = 50
+
+class FakeDraftModel:
+    """Modelo local com a mesma interface do AIContactLogic (latência e falhas simuladas)."""
+
+    name = "fake"
+
+    def __init__(self, latency=None, fail_rate=None, seed=0):
+        self.latency = float(os.environ.get("FAKE_MODEL_LATENCY", "0.05")) if latency is None else latency
+        self.fail_rate = float(os.environ.get("FAKE_MODEL_FAIL_RATE", "0")) if fail_rate is None else fail_rate
+        self.rng = random.Random(seed)
+        self.calls = 0
+
+    async def draft_authorization_message(self, ad_details):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        if self.rng.random() < self.fail_rate:
+            raise RuntimeError("falha simulada do modelo")
+        return (f"Olá! Vi seu anúncio \"{ad_details['title']}\" ({ad_details['price']}, {ad_details['location']}). "
+                "Sou corretor em São Sebastião e gostaria de ajudar na venda: posso apresentar uma proposta "
+                "de autorização para divulgação, sem custo até fechar negócio. Podemos conversar?")
+
+def get_model():
+    if AI_MODEL == "fake":
+        return FakeDraftModel()
+    from ai_contact_logic import AIContactLogic
+    model = AIContactLogic()
+    if not hasattr(model, 'draft_authorization_message'):
+        raise RuntimeError("AIContactLogic não possui o método draft_authorization_message. Verifique se o arquivo ai_contact_logic.py está correto.")
+    return model
+
+def init_drafts(cursor):
+    # Um rascunho por anúncio; draft_key liga anúncios quase idênticos ao mesmo texto
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS drafts (
+            listing_id TEXT PRIMARY KEY,
+            draft_key TEXT,
+            message TEXT,
+            model TEXT,
+            cached BOOLEAN DEFAULT 0,
+            created_at TIMESTAMP
+        )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_drafts_key ON drafts (draft_key)")
+
+def draft_key(ad):
+    """Chave de cache: anúncios que só diferem em caixa/acentos/ordem de palavras ou centavos compartilham o rascunho."""
+    price = round(ad["price_cents"], -5) if ad.get("price_cents") else None  # faixas de R$ 1.000
+    area = round(ad["area_m2"]) if ad.get("area_m2") else None
+    features = [ad.get("ad_type"), (ad.get("neighbourhood") or "").strip().lower(), ad.get("bedrooms"), price, area,
+                " ".join(sorted(title_tokens(ad.get("title"))))]
+    return hashlib.sha1(repr(features).encode()).hexdigest()
+
+def pending_owners(conn, limit):
+    cursor = conn.execute('''
+        SELECT id, title, price, url, location, ad_type, price_cents, area_m2, bedrooms, neighbourhood
+        FROM imoveis WHERE ad_type = 'owner' AND contacted = 0 AND source_site = 'olx'
+        ORDER BY date_added LIMIT ?
+    ''', (limit,))
+    columns = [c[0] for c in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor]
+
+def cached_drafts(conn, keys):
+    """Rascunhos já gerados para estas chaves (um SELECT por lote de IN_CHUNK)."""
+    return dict(select_in(conn, "SELECT draft_key, message FROM drafts WHERE draft_key IN ({placeholders}) AND message IS NOT NULL GROUP BY draft_key", keys))
+
+async def draft_with_retry(model, semaphore, ad):
+    """Uma chamada ao modelo com no máximo DRAFT_CONCURRENCY simultâneas; None se esgotar as tentativas."""
+    ad_details = {"title": ad["title"], "price": ad["price"], "location": ad["location"], "url": ad["url"], "professionalAd": False}
+    for attempt in range(DRAFT_MAX_RETRIES + 1):
+        async with semaphore:
+            try:
+                return await asyncio.wait_for(model.draft_authorization_message(ad_details), timeout=DRAFT_TIMEOUT)
+            except Exception as e:
+                error = e
+        count("draft_retries")
+        if attempt < DRAFT_MAX_RETRIES:
+            # Fora do semáforo: quem está esperando não segura a vaga de outra chamada
+            await asyncio.sleep(backoff_delay(attempt))
+    print(f"[{datetime.now().strftime('%H:%M:%S')}] Rascunho falhou para {ad['id']}: {error}")
+    return None
+
+def save_drafts(conn, rows, model_name):
+    """Grava (listing_id, draft_key, mensagem, cached) e marca os anúncios como contatados, numa transação."""
+    now = datetime.now().isoformat(sep=" ")
+    with conn:
+        conn.executemany('''
+            INSERT INTO drafts (listing_id, draft_key, message, model, cached, created_at) VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(listing_id) DO UPDATE SET draft_key = excluded.draft_key, message = excluded.message,
+                model = excluded.model, cached = excluded.cached, created_at = excluded.created_at
+        ''', [(listing_id, key, message, model_name, cached, now) for listing_id, key, message, cached in rows])
+        conn.executemany("UPDATE imoveis SET contacted = 1 WHERE id = ?", [(row[0],) for row in rows])
+
+async def draft_pending(conn, model=None, limit=None):
+    """Gera e grava os rascunhos de todos os proprietários pendentes. Devolve as estatísticas."""
+    model = model or get_model()
+    model_name = getattr(model, "name", type(model).__name__)
+    ads = pending_owners(conn, limit or DRAFT_LIMIT)
+    stats = {"pending": len(ads), "drafted": 0, "cached": 0, "failed": 0, "model_calls": 0}
+    if not ads:
+        print("Nenhum proprietário pendente de contato.")
+        return stats
+    started = time.monotonic()
+
+    by_key = {}
+    for ad in ads:
+        by_key.setdefault(draft_key(ad), []).append(ad)
+    known = cached_drafts(conn, by_key)
+
+    # Chaves já conhecidas: gravadas direto, sem chamar o modelo
+    reused = [(ad["id"], key, known[key], True) for key, group in by_key.items() if key in known for ad in group]
+    for start in range(0, len(reused), DRAFT_COMMIT_EVERY):
+        save_drafts(conn, reused[start:start + DRAFT_COMMIT_EVERY], model_name)
+    stats["cached"] += len(reused)
+
+    # Uma chamada por chave nova; o texto vale para todo o grupo
+    semaphore = asyncio.Semaphore(DRAFT_CONCURRENCY)
+
+    async def run(key, group):
+        return key, group, await draft_with_retry(model, semaphore, group[0])
+
+    tasks = [run(key, group) for key, group in by_key.items() if key not in known]
+    stats["model_calls"] = len(tasks)
+    buffer = []
+    with span("ai_drafts"):
+        for finished in asyncio.as_completed(tasks):
+            key, group, message = await finished
+            if message is None:
+                stats["failed"] += len(group)
+                continue
+            buffer.extend((ad["id"], key, message, i > 0) for i, ad in enumerate(group))
+            stats["drafted"] += 1
+            stats["cached"] += len(group) - 1
+            if len(buffer) >= DRAFT_COMMIT_EVERY:
+                save_drafts(conn, buffer, model_name)
+                buffer = []
+    if buffer:
+        save_drafts(conn, buffer, model_name)
+
+    for name in ("drafted", "cached", "failed", "model_calls"):
+        count(f"drafts_{name}", stats[name])
+    print(f"[{datetime.now().strftime('%H:%M:%S')}] Rascunhos IA: {stats['pending']} pendentes, {stats['drafted']} gerados, "
+          f"{stats['cached']} reaproveitados, {stats['failed']} falhas em {time.monotonic() - started:.1f}s.")
+    return stats
+
+def main():
+    from migrations import migrate
+    from storage import ImovelStore
+
+    parser = argparse.ArgumentParser(description="Gera os rascunhos de contato dos proprietários pendentes.")
+    parser.add_argument("--db", default="olx_imoveis.db")
+    parser.add_argument("--limit", type=int, default=DRAFT_LIMIT)
+    parser.add_argument("--fake", action="store_true", help="usa o FakeDraftModel (offline)")
+    args = parser.parse_args()
+    store = ImovelStore(args.db)
+    try:
+        migrate(store.conn)
+        asyncio.run(draft_pending(store.conn, FakeDraftModel() if args.fake else None, args.limit))
+    finally:
+        store.close()
+
+if __name__ == "__main__":
+    main()
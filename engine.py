@@ -0,0 +1,153 @@
+import os
+from datetime import datetime
+
+from extractors import extract_listings, olx_ads_from_next_data
+from history import touch_snapshots
+from metrics import count, span
+from olx_http import fetch_next_data_async
+from page_cache import block_hash
+from waits import wait_until_ready
+
+# Busca o __NEXT_DATA__ da OLX via HTTP puro antes de recorrer ao Chromium
+OLX_HTTP_FAST_PATH = os.environ.get("OLX_HTTP_FAST_PATH", "1") == "1"
+
+# outerHTML dos cards concatenado no próprio Chromium (a página não precisa vir para o Python)
+CARD_BLOCK_JS = "els => els.map(e => e.outerHTML).join('\\n')"
+
+def page_urls(site):
+    """URLs das páginas 1..max_pages segundo a regra de paginação do site."""
+    pagination = site["pagination"]
+    for p_num in range(1, site["max_pages"] + 1):
+        if p_num == 1:
+            yield p_num, site["url"]
+        elif pagination is None:
+            return
+        elif pagination["type"] == "query":
+            separator = "&" if "?" in site["url"] else "?"
+            yield p_num, f"{site['url']}{separator}{pagination['param']}={p_num}"
+        elif pagination["type"] == "template":
+            yield p_num, pagination["template"].format(page=p_num)
+
+def _keep_paginating(site, p_num, ads, store, high_water):
+    """Paginação adaptativa: só segue se a página ainda trouxe anúncios inéditos / recentes."""
+    # Anúncios fixos no topo se repetem em toda página, independente da data
+    organic = [ad for ad in ads if not (ad.get("raw") or {}).get("fixedOnTop")] or ads
+    with span("seen_ids", site["name"]):
+        known = store.seen_ids(ad["id"] for ad in organic)
+    if all(str(ad["id"]) in known for ad in organic):
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] {site['label']}: p{p_num} só tem anúncios conhecidos, parando.")
+        return False
+    if high_water and not any(int((ad.get("raw") or {}).get("origListTime") or 0) > high_water for ad in organic):
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] {site['label']}: p{p_num} só tem anúncios anteriores à última rodada, parando.")
+        return False
+    return True
+
+async def _render_page(page, site, url, cache):
+    """Abre a página no navegador e extrai os anúncios. Devolve (anúncios, entrada, nova_entrada).
+
+    Com cache, anúncios é None se a página não mudou desde a última vez: 304 no GET
+    condicional (se o servidor manda ETag/Last-Modified) ou mesmo hash do bloco de cards.
+    nova_entrada traz os argumentos de cache.put, que só deve rodar depois de os
+    anúncios estarem salvos (senão uma falha ao salvar vira "sem mudanças" na próxima).
+    """
+    name = site["name"]
+    entry = cache.get(url) if cache is not None else None
+    if entry and entry["honours_304"] and (entry["etag"] or entry["last_modified"]):
+        with span("revalidate", name):
+            try:
+                response = await page.request.get(url, headers=cache.conditional_headers(entry), timeout=15000)
+                not_modified = response.status == 304
+                if not not_modified:
+                    # Documento baixado à toa (o goto baixa de novo): não repete o GET para esta URL
+                    count("revalidate_misses", site=name)
+                    cache.ignores_304(url)
+            except Exception:
+                not_modified = False
+        if not_modified:
+            return None, entry, None
+    with span("navigation", name):
+        response = await page.goto(url, wait_until="domcontentloaded", timeout=60000)
+    with span("wait", name):
+        await wait_until_ready(page, name, site["ready"])
+    digest = None
+    if cache is not None:
+        with span("block_hash", name):
+            digest = block_hash(await page.eval_on_selector_all(site["cards"], CARD_BLOCK_JS))
+        if entry and entry["content_hash"] == digest:
+            return None, entry, None
+    with span("content", name):
+        html = await page.content()
+    count("html_bytes", len(html), site=name)
+    with span("parse", name):
+        ads = extract_listings(html, site)
+    fresh = None
+    if cache is not None and ads:
+        fresh = {"url": url, "site": name, "headers": response.headers if response else None, "content_hash": digest,
+                 "ad_ids": [ad["id"] for ad in ads], "size_bytes": len(html)}
+    return ads, entry, fresh
+
+async def scrape_site(page, site, store, cache=None, pending=None):
+    """Motor genérico: pagina, espera, extrai e devolve os anúncios de um site do registro.
+
+    Com cache (page_cache.PageCache) e "page_cache" ativo no site, páginas sem mudança
+    param a paginação sem parse nem diff; só o last_seen dos anúncios delas é renovado.
+    O que só pode ser gravado depois de os anúncios estarem salvos vai para pending:
+    pending["pages"] (argumentos de cache.put) e pending["state"] (marca d'água da
+    busca). Sem pending o cache só é consultado e a marca d'água é gravada aqui mesmo.
+    """
+    all_ads = []
+    cache = cache if site.get("page_cache") and site["kind"] == "cards" else None
+    print(f"Iniciando raspagem {site['label']}")
+    # Tenta primeiro o caminho HTTP leve; se for bloqueado, usa o navegador até o fim desta busca
+    use_http = site["kind"] == "next_data" and site.get("http_fast_path") and OLX_HTTP_FAST_PATH
+    # Marca d'água do origListTime por busca (só sites com payload estruturado)
+    state_key = f"{site['source_site']}:{site['ad_type']}:high_water"
+    high_water = int(store.get_state(state_key, 0)) if site["kind"] == "next_data" else 0
+    newest = high_water
+    for p_num, url in page_urls(site):
+        print(f"Buscando {site['label']} [p{p_num}]: {url}")
+        try:
+            ads = None
+            name = site["name"]
+            if use_http:
+                with span("http", name):
+                    data = await fetch_next_data_async(url)
+                if data is None:
+                    use_http = False
+                    count("http_fallbacks", site=name)
+                    print(f"[{datetime.now().strftime('%H:%M:%S')}] {site['label']}: caminho HTTP indisponível, usando Playwright.")
+                else:
+                    ads = olx_ads_from_next_data(data)
+            if ads is None:
+                ads, entry, fresh = await _render_page(page, site, url, cache)
+                if ads is None:
+                    # Página igual à da última vez: nada novo aqui nem (pela ordem da listagem) adiante
+                    count("cache_hits", site=name)
+                    touch_snapshots(store.conn, entry["ad_ids"])
+                    cache.touch(url)
+                    print(f"[{datetime.now().strftime('%H:%M:%S')}] {site['label']}: p{p_num} sem mudanças (cache), pulando parse.")
+                    break
+                if fresh is not None and pending is not None:
+                    pending["pages"].append(fresh)
+            count("pages", site=name)
+            count("ads", len(ads), site=name)
+            if not ads:
+                print(f"[{datetime.now().strftime('%H:%M:%S')}] AVISO: nenhum anúncio extraído em {site['label']} [p{p_num}].")
+                break
+            all_ads.extend(ads)
+            newest = max([newest] + [int((ad.get("raw") or {}).get("origListTime") or 0) for ad in ads])
+            if not _keep_paginating(site, p_num, ads, store, high_water):
+                break
+        except Exception as e:
+            count("errors", site=site["name"])
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] Erro {site['label']}: {e}")
+            break
+    if newest > high_water:
+        # Gravada antes de salvar, a marca d'água faria um retry (ou a próxima rodada, se o
+        # save falhar) parar na p1 e perder os anúncios novos das páginas seguintes
+        if pending is not None:
+            pending["state"][state_key] = newest
+        else:
+            store.set_state(state_key, newest)
+    print(f"[{datetime.now().strftime('%H:%M:%S')}] Fim {site['label']}: {len(all_ads)} anúncios encontrados.")
+    return all_ads
@@ -0,0 +1,163 @@
+"""Extratores puros: HTML -> lista de anúncios, sem navegador nem banco.
+
+extract_listings(html, site, backend) recebe o HTML da listagem e a config do site
+(sites.py) e devolve os dicts que save_new_imoveis espera. O backend de parsing é
+plugável: "html.parser" (padrão, só depende do bs4), "lxml" e "selectolax" (se
+instalados).
+"""
+import os
+
+from bs4 import BeautifulSoup
+
+from olx_http import extract_next_data
+
+class SoupNode:
+    """Adaptador mínimo sobre um Tag do BeautifulSoup."""
+
+    def __init__(self, tag):
+        self.tag = tag
+
+    def select(self, css):
+        return [SoupNode(t) for t in self.tag.select(css)]
+
+    def select_one(self, css):
+        found = self.tag.select_one(css)
+        return SoupNode(found) if found is not None else None
+
+    def text(self):
+        return self.tag.get_text(strip=True)
+
+    def attr(self, name):
+        return self.tag.get(name)
+
+    def first_containing(self, tag_name, needle):
+        found = self.tag.find(lambda t: t.name == tag_name and needle in t.text)
+        return SoupNode(found) if found is not None else None
+
+class LexborNode:
+    """Mesmo adaptador sobre um nó do selectolax (parser Lexbor)."""
+
+    def __init__(self, node):
+        self.node = node
+
+    def select(self, css):
+        return [LexborNode(n) for n in self.node.css(css)]
+
+    def select_one(self, css):
+        found = self.node.css_first(css)
+        return LexborNode(found) if found is not None else None
+
+    def text(self):
+        return self.node.text(strip=True)
+
+    def attr(self, name):
+        return self.node.attributes.get(name)
+
+    def first_containing(self, tag_name, needle):
+        for node in self.node.css(tag_name):
+            if needle in node.text():
+                return LexborNode(node)
+        return None
+
+def _soup_backend(features):
+    return lambda html: SoupNode(BeautifulSoup(html, features))
+
+def _selectolax_backend(html):
+    from selectolax.lexbor import LexborHTMLParser
+    return LexborNode(LexborHTMLParser(html).root)
+
+BACKENDS = {
+    "html.parser": _soup_backend("html.parser"),
+    "lxml": _soup_backend("lxml"),
+    "selectolax": _selectolax_backend,
+}
+
+# Backend padrão de todos os sites; "parser_backend" na config ou PARSER_BACKEND_<SITE> sobrescrevem
+DEFAULT_BACKEND = os.environ.get("PARSER_BACKEND", "html.parser")
+
+def backend_for(site):
+    env = f"PARSER_BACKEND_{site['name'].upper().replace('-', '_')}"
+    return os.environ.get(env) or site.get("parser_backend") or DEFAULT_BACKEND
+
+def available_backends():
+    """Backends cujas dependências estão instaladas neste ambiente."""
+    available = []
+    for name, build in BACKENDS.items():
+        try:
+            build("<html></html>")
+            available.append(name)
+        except Exception:
+            pass
+    return available
+
+def parse_document(html, backend="html.parser"):
+    return BACKENDS[backend](html)
+
+def olx_ads_from_next_data(data):
+    """Anúncios do __NEXT_DATA__ da OLX (ignora os slots de publicidade, sem listId)."""
+    ads_raw = data.get('props', {}).get('pageProps', {}).get('ads', [])
+    ads = []
+    for a in ads_raw:
+        if not a.get("listId"):
+            continue
+        ads.append({
+            "id": a.get("listId"),
+            "title": a.get("subject"),
+            "price": a.get("price", "Sob consulta"),
+            "url": a.get("url"),
+            "location": a.get("location", "S. Sebastião"),
+            "category": a.get("category", "Imóvel"),
+            "raw": a
+        })
+    return ads
+
+def derive_id(href, rule):
+    """ID estável a partir do último segmento da URL (regra "id" da config do site)."""
+    parts = href.split('/')
+    raw_id = parts[-1].split('?')[0] if rule.get("strip_query", True) else parts[-1]
+    if raw_id in rule.get("fallback_on", []) and len(parts) > 1:
+        raw_id = parts[-2]
+    return f"{rule.get('prefix', '')}{raw_id}"
+
+def _first(card, selectors):
+    for selector in selectors or []:
+        if isinstance(selector, (tuple, list)) and selector[0] == "contains":
+            found = card.first_containing(selector[1], selector[2])
+        else:
+            found = card.select_one(selector)
+        if found is not None:
+            return found
+    return None
+
+def extract_cards(html, site, backend="html.parser"):
+    """Anúncios de uma listagem em cards, guiado pelos seletores declarados no site."""
+    doc = parse_document(html, backend)
+    fields, defaults = site["fields"], site["defaults"]
+    ads = []
+    for card in doc.select(site["cards"]):
+        link_tag = card if fields.get("link") is None else _first(card, fields["link"])
+        title_tag = _first(card, fields.get("title"))
+        href = link_tag.attr('href') if link_tag is not None else None
+        if not href or title_tag is None:
+            continue
+        if not href.startswith('http'):
+            href = site["base_url"] + href
+        price_tag = _first(card, fields.get("price"))
+        loc_tag = _first(card, fields.get("location"))
+        ads.append({
+            "id": derive_id(href, site["id"]),
+            "title": title_tag.text(),
+            "price": price_tag.text() if price_tag else defaults["price"],
+            "url": href,
+            "location": loc_tag.text() if loc_tag else defaults["location"],
+            "category": defaults["category"]
+        })
+    return ads
+
+def extract_listings(html, site, backend=None):
+    """Ponto único de extração: escolhe o extrator pelo "kind" do site."""
+    if site["kind"] == "next_data":
+        # Não precisa de DOM: o JSON sai direto por regex (backend ignorado)
+        data = extract_next_data(html)
+        return olx_ads_from_next_data(data) if data else []
+    return extract_cards(html, site, backend or backend_for(site))
@@ -0,0 +1,166 @@
+import hashlib
+import json
+import os
+import time
+from datetime import datetime, timedelta
+
+from normalize import parse_price_cents, normalize_ad
+
+# Um anúncio que some por mais que isso (horas) é dado como retirado, e só se estava no
+# trecho da busca que a rodada percorreu (ver record_snapshots)
+DISAPPEAR_AFTER_HOURS = int(os.environ.get("DISAPPEAR_AFTER_HOURS", "72"))
+# Subidas (bump) com menos de 1h de diferença são ruído do lastBumpAgeSecs
+BUMP_TOLERANCE_SECS = 3600
+
+def init_history(cursor):
+    # Último estado conhecido de cada anúncio (um registro por ID)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS listing_snapshots (
+            id TEXT PRIMARY KEY,
+            source_site TEXT,
+            fingerprint TEXT,
+            price TEXT,
+            price_cents INTEGER,
+            old_price_cents INTEGER,
+            bumped_at INTEGER,
+            first_seen TIMESTAMP,
+            last_seen TIMESTAMP,
+            present BOOLEAN DEFAULT 1
+        )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_snapshots_site_seen ON listing_snapshots (source_site, present, last_seen)")
+    # Só as mudanças: price_drop, price_increase, bump, disappeared, reappeared
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS listing_events (
+            event_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            listing_id TEXT,
+            source_site TEXT,
+            event TEXT,
+            old_value TEXT,
+            new_value TEXT,
+            created_at TIMESTAMP,
+            notified BOOLEAN DEFAULT 0
+        )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_events_listing ON listing_events (listing_id, created_at)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_events_pending ON listing_events (event, notified)")
+
+def _snapshot_row(ad, source_site, now_ts):
+    raw = ad.get("raw") or {}
+    price_cents = normalize_ad(ad)["price_cents"]
+    old_price_cents = parse_price_cents(raw.get("oldPrice"))
+    bump_age = int(raw.get("lastBumpAgeSecs") or 0)
+    # lastBumpAgeSecs = 0 significa "nunca subiu"; senão guardamos o instante absoluto da subida
+    bumped_at = now_ts - bump_age if bump_age else None
+    bump_bucket = bumped_at // BUMP_TOLERANCE_SECS if bumped_at else None
+    fingerprint = hashlib.sha1(json.dumps([ad.get("price"), price_cents, old_price_cents, raw.get("priceReductionBadge"), bump_bucket]).encode()).hexdigest()
+    return (str(ad.get("id")), source_site, fingerprint, ad.get("price"), price_cents, old_price_cents, bumped_at)
+
+def record_snapshots(conn, ads, source_site, ad_type):
+    """Compara em lote os anúncios raspados com o último snapshot e grava só as mudanças.
+
+    Tudo roda em SQL sobre uma tabela temporária (sem consulta por ID). Retorna
+    {evento: quantidade}.
+
+    A paginação adaptativa para cedo e as imobiliárias só têm a primeira página, então
+    "retirado" só vale para anúncios desta busca (source_site + ad_type) que estariam no
+    trecho percorrido: subida/publicação mais recente que o anúncio orgânico mais antigo
+    raspado agora. Sem essas datas (imobiliárias) não há como saber e nada é retirado.
+    """
+    now = datetime.now()
+    now_str = now.isoformat(sep=" ")
+    rows = {}
+    oldest = None
+    for ad in ads:
+        row = _snapshot_row(ad, source_site, int(time.time()))
+        rows[row[0]] = row
+        raw = ad.get("raw") or {}
+        # Fixos no topo aparecem em toda página, fora da ordem por data
+        position = max(row[6] or 0, int(raw.get("origListTime") or 0))
+        if position and not raw.get("fixedOnTop"):
+            oldest = position if oldest is None else min(oldest, position)
+    cursor = conn.cursor()
+    with conn:
+        cursor.execute("CREATE TEMP TABLE IF NOT EXISTS scraped (id TEXT PRIMARY KEY, source_site TEXT, fingerprint TEXT, price TEXT, price_cents INTEGER, old_price_cents INTEGER, bumped_at INTEGER)")
+        cursor.execute("DELETE FROM scraped")
+        cursor.executemany("INSERT INTO scraped VALUES (?, ?, ?, ?, ?, ?, ?)", rows.values())
+
+        # Só anúncios cujo fingerprint mudou (ou que tinham sumido) entram na comparação campo a campo
+        cursor.execute('''
+            INSERT INTO listing_events (listing_id, source_site, event, old_value, new_value, created_at)
+            SELECT s.id, s.source_site, CASE WHEN s.price_cents < p.price_cents THEN 'price_drop' ELSE 'price_increase' END,
+                   p.price, s.price, ?
+            FROM scraped s JOIN listing_snapshots p ON p.id = s.id
+            WHERE s.fingerprint != p.fingerprint AND s.price_cents IS NOT NULL AND p.price_cents IS NOT NULL
+              AND s.price_cents != p.price_cents
+        ''', (now_str,))
+        cursor.execute('''
+            INSERT INTO listing_events (listing_id, source_site, event, old_value, new_value, created_at)
+            SELECT s.id, s.source_site, 'bump', p.bumped_at, s.bumped_at, ?
+            FROM scraped s JOIN listing_snapshots p ON p.id = s.id
+            WHERE s.fingerprint != p.fingerprint AND s.bumped_at IS NOT NULL
+              AND s.bumped_at > COALESCE(p.bumped_at, 0) + ?
+        ''', (now_str, BUMP_TOLERANCE_SECS))
+        cursor.execute('''
+            INSERT INTO listing_events (listing_id, source_site, event, old_value, new_value, created_at)
+            SELECT s.id, s.source_site, 'reappeared', p.last_seen, ?, ?
+            FROM scraped s JOIN listing_snapshots p ON p.id = s.id
+            WHERE p.present = 0
+        ''', (now_str, now_str))
+
+        # Mantém o preço atual também na tabela principal
+        cursor.execute('''
+            UPDATE imoveis SET price = s.price, price_cents = s.price_cents
+            FROM scraped s JOIN listing_snapshots p ON p.id = s.id
+            WHERE imoveis.id = s.id AND s.fingerprint != p.fingerprint AND s.price_cents IS NOT p.price_cents
+        ''')
+        cursor.execute('''
+            INSERT INTO listing_snapshots (id, source_site, fingerprint, price, price_cents, old_price_cents, bumped_at, first_seen, last_seen, present)
+            SELECT id, source_site, fingerprint, price, price_cents, old_price_cents, bumped_at, ?, ?, 1 FROM scraped WHERE true
+            ON CONFLICT(id) DO UPDATE SET
+                fingerprint = excluded.fingerprint, price = excluded.price, price_cents = excluded.price_cents,
+                old_price_cents = excluded.old_price_cents, bumped_at = COALESCE(excluded.bumped_at, listing_snapshots.bumped_at),
+                last_seen = excluded.last_seen, present = 1
+        ''', (now_str, now_str))
+
+        if oldest is not None:
+            cutoff = (now - timedelta(hours=DISAPPEAR_AFTER_HOURS)).isoformat(sep=" ")
+            gone = '''
+                FROM listing_snapshots p JOIN imoveis i ON i.id = p.id
+                WHERE p.source_site = ? AND i.ad_type = ? AND p.present = 1 AND p.last_seen < ?
+                  AND MAX(COALESCE(p.bumped_at, 0), COALESCE(i.list_time, 0)) >= ?
+            '''
+            params = (source_site, ad_type, cutoff, oldest)
+            cursor.execute(f'''
+                INSERT INTO listing_events (listing_id, source_site, event, old_value, new_value, created_at)
+                SELECT p.id, p.source_site, 'disappeared', p.last_seen, NULL, ? {gone}
+            ''', (now_str,) + params)
+            cursor.execute(f"UPDATE listing_snapshots SET present = 0 WHERE id IN (SELECT p.id {gone})", params)
+        cursor.execute("DELETE FROM scraped")
+
+    counts = dict(conn.execute("SELECT event, COUNT(*) FROM listing_events WHERE created_at = ? AND source_site = ? GROUP BY event", (now_str, source_site)).fetchall())
+    if counts:
+        summary = ", ".join(f"{event}={count}" for event, count in sorted(counts.items()))
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] Histórico {source_site}: {summary}.")
+    return counts
+
+def touch_snapshots(conn, ids):
+    """Renova o last_seen de anúncios vistos numa página que não mudou (sem refazer o diff)."""
+    now_str = datetime.now().isoformat(sep=" ")
+    with conn:
+        conn.executemany("UPDATE listing_snapshots SET last_seen = ? WHERE id = ? AND present = 1", [(now_str, str(i)) for i in ids])
+
+def pending_price_drops(conn, limit=200):
+    """Quedas de preço ainda não notificadas, com os dados do anúncio."""
+    cursor = conn.execute('''
+        SELECT e.event_id, e.old_value, e.new_value, i.id, i.title, i.url, i.location, i.source_site, i.ad_type
+        FROM listing_events e JOIN imoveis i ON i.id = e.listing_id
+        WHERE e.event = 'price_drop' AND e.notified = 0
+        ORDER BY e.event_id LIMIT ?
+    ''', (limit,))
+    columns = [c[0] for c in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor]
+
+def mark_events_notified(conn, event_ids):
+    with conn:
+        conn.executemany("UPDATE listing_events SET notified = 1 WHERE event_id = ?", [(event_id,) for event_id in event_ids])
@@ -0,0 +1,180 @@
+"""Instrumentação da rodada: spans por etapa, contadores por site e relatório final.
+
+    with span("navigation", site="riviera"):
+        await page.goto(...)
+    count("ads", len(ads), site="riviera")
+
+Ao fim, write_report() grava METRICS_DIR/run_report.json (a rodada atual),
+acrescenta uma linha em run_history.jsonl (para comparar rodadas diárias) e
+escreve scraper.prom no formato textfile do node_exporter. No GitHub Actions o
+run_history.jsonl é versionado junto com os dados e o resto sobe como artifact. PROFILER=cprofile ou
+pyinstrument envolve a rodada inteira num profiler (profiled()).
+"""
+import json
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+METRICS_DIR = os.environ.get("METRICS_DIR", "metrics")
+# "" (desligado), "cprofile" ou "pyinstrument"
+PROFILER = os.environ.get("PROFILER", "").lower()
+
+# Site "-" = etapas globais da rodada (init_db, notificação...)
+GLOBAL = "-"
+
+_run = {}
+
+def reset():
+    """Começa uma rodada nova (zera spans e contadores)."""
+    _run.clear()
+    _run.update({
+        "started_at": datetime.now().isoformat(timespec="seconds"),
+        "started": time.perf_counter(),
+        "spans": {},     # (site, etapa) -> [chamadas, segundos, pior]
+        "counters": {},  # (site, nome) -> valor
+    })
+
+reset()
+
+@contextmanager
+def span(stage, site=GLOBAL):
+    """Cronometra um bloco (sync ou com await dentro) e acumula em (site, etapa)."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        entry = _run["spans"].setdefault((site, stage), [0, 0.0, 0.0])
+        entry[0] += 1
+        entry[1] += elapsed
+        entry[2] = max(entry[2], elapsed)
+
+def count(name, n=1, site=GLOBAL):
+    _run["counters"][(site, name)] = _run["counters"].get((site, name), 0) + n
+
+def report():
+    """Snapshot da rodada como dict serializável."""
+    sites = {}
+    for (site, stage), (calls, total, worst) in _run["spans"].items():
+        sites.setdefault(site, {"stages": {}, "counters": {}})["stages"][stage] = {
+            "calls": calls, "seconds": round(total, 4), "max_seconds": round(worst, 4)}
+    for (site, name), value in _run["counters"].items():
+        sites.setdefault(site, {"stages": {}, "counters": {}})["counters"][name] = value
+    return {
+        "started_at": _run["started_at"],
+        "duration_seconds": round(time.perf_counter() - _run["started"], 3),
+        "sites": sites,
+    }
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"')
+
+def prometheus_text(data):
+    lines = [
+        "# HELP scraper_run_duration_seconds Duração total da última rodada.",
+        "# TYPE scraper_run_duration_seconds gauge",
+        f"scraper_run_duration_seconds {data['duration_seconds']}",
+        "# HELP scraper_run_timestamp_seconds Fim da última rodada (epoch).",
+        "# TYPE scraper_run_timestamp_seconds gauge",
+        f"scraper_run_timestamp_seconds {int(time.time())}",
+        "# HELP scraper_stage_seconds Tempo gasto por etapa e site na última rodada.",
+        "# TYPE scraper_stage_seconds gauge",
+    ]
+    for site, entry in sorted(data["sites"].items()):
+        for stage, s in sorted(entry["stages"].items()):
+            lines.append(f'scraper_stage_seconds{{site="{_label(site)}",stage="{_label(stage)}"}} {s["seconds"]}')
+    lines += [
+        "# HELP scraper_stage_calls Quantas vezes a etapa rodou por site na última rodada.",
+        "# TYPE scraper_stage_calls gauge",
+    ]
+    for site, entry in sorted(data["sites"].items()):
+        for stage, s in sorted(entry["stages"].items()):
+            lines.append(f'scraper_stage_calls{{site="{_label(site)}",stage="{_label(stage)}"}} {s["calls"]}')
+    lines += [
+        "# HELP scraper_count Contadores da última rodada (páginas, anúncios, bytes, erros...).",
+        "# TYPE scraper_count gauge",
+    ]
+    for site, entry in sorted(data["sites"].items()):
+        for name, value in sorted(entry["counters"].items()):
+            lines.append(f'scraper_count{{site="{_label(site)}",name="{_label(name)}"}} {value}')
+    return "\n".join(lines) + "\n"
+
+def _write_atomic(path, text):
+    # O node_exporter pode ler no meio da escrita: grava ao lado e troca de uma vez
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+def log_summary(data):
+    """Resumo legível: sites do mais lento ao mais rápido, com a etapa dominante."""
+    rows = []
+    for site, entry in data["sites"].items():
+        if site == GLOBAL or not entry["stages"]:
+            continue
+        total = entry["stages"].get("site_total", {}).get("seconds") or sum(s["seconds"] for s in entry["stages"].values())
+        stages = {k: v for k, v in entry["stages"].items() if k != "site_total"}
+        top = max(stages.items(), key=lambda kv: kv[1]["seconds"])[0] if stages else "-"
+        rows.append((total, site, top, entry["counters"]))
+    for total, site, top, counters in sorted(rows, reverse=True):
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] Métricas {site}: {total:.1f}s (mais lenta: {top}), "
+              f"{counters.get('pages', 0)} páginas, {counters.get('ads', 0)} anúncios, "
+              f"{counters.get('new_ads', 0)} novos, {counters.get('errors', 0)} erros.")
+
+def write_report(directory=None):
+    """Grava run_report.json, run_history.jsonl e scraper.prom; devolve o relatório."""
+    directory = directory or METRICS_DIR
+    data = report()
+    try:
+        os.makedirs(directory, exist_ok=True)
+        _write_atomic(os.path.join(directory, "run_report.json"), json.dumps(data, ensure_ascii=False, indent=2))
+        with open(os.path.join(directory, "run_history.jsonl"), "a", encoding="utf-8") as f:
+            f.write(json.dumps(data, ensure_ascii=False) + "\n")
+        _write_atomic(os.path.join(directory, "scraper.prom"), prometheus_text(data))
+    except OSError as e:
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] Erro ao gravar métricas: {e}")
+    log_summary(data)
+    print(f"[{datetime.now().strftime('%H:%M:%S')}] Rodada: {data['duration_seconds']:.1f}s, relatório em {directory}/run_report.json")
+    return data
+
+@contextmanager
+def profiled(directory=None):
+    """Envolve o bloco no profiler escolhido por PROFILER (sem custo se desligado)."""
+    directory = directory or METRICS_DIR
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    if PROFILER == "cprofile":
+        import cProfile
+        import pstats
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, f"profile-{stamp}.prof")
+            profiler.dump_stats(path)
+            pstats.Stats(profiler).sort_stats("cumulative").print_stats(25)
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] Perfil cProfile em {path} (snakeviz/pstats).")
+    elif PROFILER == "pyinstrument":
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] pyinstrument não instalado, rodando sem profiler.")
+            yield
+            return
+        # async_mode="enabled" atribui o tempo de await à corrotina que esperou
+        profiler = Profiler(async_mode="enabled")
+        profiler.start()
+        try:
+            yield
+        finally:
+            profiler.stop()
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, f"profile-{stamp}.html")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(profiler.output_html())
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] Perfil pyinstrument em {path}.")
+    else:
+        yield
@@ -0,0 +1,93 @@
+"""Migrações versionadas do banco (tabela schema_migrations).
+
+Cada migração roda uma única vez, em ordem; numa base em dia, migrate() é um SELECT.
+Para mudar o schema, acrescente (versão, nome, função) ao fim de MIGRATIONS; nunca
+edite uma migração já publicada.
+"""
+from datetime import datetime
+
+from dedup import init_dedup
+from drafting import init_drafts
+from history import init_history
+from normalize import normalize_ad
+
+def _baseline(cursor):
+    # Tabela principal com suporte a múltiplos sites e tipos de anúncio
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS imoveis (
+            id TEXT PRIMARY KEY,
+            title TEXT,
+            price TEXT,
+            url TEXT,
+            category TEXT,
+            location TEXT,
+            source_site TEXT DEFAULT 'olx',
+            ad_type TEXT DEFAULT 'owner',
+            date_added TIMESTAMP,
+            notified BOOLEAN DEFAULT 0,
+            contacted BOOLEAN DEFAULT 0
+        )
+    ''')
+
+    # Bases anteriores ao schema_migrations podem estar em qualquer estágio: é a última
+    # vez que olhamos as colunas com PRAGMA table_info
+    cursor.execute("PRAGMA table_info(imoveis)")
+    columns = [column[1] for column in cursor.fetchall()]
+    if "source_site" not in columns:
+        cursor.execute("ALTER TABLE imoveis ADD COLUMN source_site TEXT DEFAULT 'olx'")
+    if "ad_type" not in columns:
+        cursor.execute("ALTER TABLE imoveis ADD COLUMN ad_type TEXT DEFAULT 'owner'")
+    if "contacted" not in columns:
+        cursor.execute("ALTER TABLE imoveis ADD COLUMN contacted BOOLEAN DEFAULT 0")
+
+    # Colunas normalizadas (preço em centavos, m², quartos, bairro, data do anúncio) + anúncio bruto comprimido
+    normalized_columns = {"price_cents": "INTEGER", "area_m2": "REAL", "bedrooms": "INTEGER", "neighbourhood": "TEXT", "list_time": "INTEGER", "raw": "BLOB"}
+    missing = [name for name in normalized_columns if name not in columns]
+    for name in missing:
+        cursor.execute(f"ALTER TABLE imoveis ADD COLUMN {name} {normalized_columns[name]}")
+    if "price_cents" in missing:
+        # Preenche as linhas antigas a partir do texto já salvo
+        rows = cursor.execute("SELECT id, title, price, location FROM imoveis").fetchall()
+        updates = []
+        for ad_id, title, price, location in rows:
+            norm = normalize_ad({"title": title, "price": price, "location": location})
+            updates.append((norm["price_cents"], norm["area_m2"], norm["bedrooms"], norm["neighbourhood"], ad_id))
+        cursor.executemany("UPDATE imoveis SET price_cents = ?, area_m2 = ?, bedrooms = ?, neighbourhood = ? WHERE id = ?", updates)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_imoveis_filter ON imoveis (ad_type, neighbourhood, price_cents)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_imoveis_source_time ON imoveis (source_site, list_time)")
+
+    # Histórico de preço / subidas / retiradas
+    init_history(cursor)
+
+    # Índice de duplicatas entre portais
+    init_dedup(cursor)
+
+    # Estado entre rodadas (ex.: marca d'água do origListTime por busca da OLX)
+    cursor.execute("CREATE TABLE IF NOT EXISTS crawl_state (key TEXT PRIMARY KEY, value TEXT)")
+
+def _applied_segments(cursor):
+    # Segmentos incrementais (segments.py) já aplicados nesta base
+    cursor.execute("CREATE TABLE IF NOT EXISTS applied_segments (name TEXT PRIMARY KEY, applied_at TIMESTAMP)")
+
+MIGRATIONS = [
+    (1, "baseline", _baseline),
+    (2, "applied_segments", _applied_segments),
+    (3, "drafts", init_drafts),
+]
+
+def schema_version(conn):
+    conn.execute("CREATE TABLE IF NOT EXISTS schema_migrations (version INTEGER PRIMARY KEY, name TEXT, applied_at TIMESTAMP)")
+    return conn.execute("SELECT COALESCE(MAX(version), 0) FROM schema_migrations").fetchone()[0]
+
+def migrate(conn):
+    """Aplica as migrações pendentes e devolve a versão final do schema."""
+    current = schema_version(conn)
+    for version, name, apply in MIGRATIONS:
+        if version <= current:
+            continue
+        with conn:
+            apply(conn.cursor())
+            conn.execute("INSERT INTO schema_migrations (version, name, applied_at) VALUES (?, ?, ?)", (version, name, datetime.now().isoformat(sep=" ")))
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] Migração {version:03d} ({name}) aplicada.")
+        current = version
+    return current
@@ -0,0 +1,84 @@
+import json
+import re
+import zlib
+
+PRICE_RE = re.compile(r"(\d{1,3}(?:\.\d{3})+|\d+)(?:,(\d{1,2}))?")
+AREA_RE = re.compile(r"(\d+(?:[.,]\d+)?)\s*m(?:²|2)\b", re.IGNORECASE)
+BEDROOMS_RE = re.compile(r"(\d+)\s*(?:dorm|quarto|su[ií]te)", re.IGNORECASE)
+
+# Partes do campo de localização que não identificam o bairro
+LOCATION_NOISE = {"são sebastião", "sao sebastiao", "s. sebastião", "sp", "brasil"}
+
+def parse_price_cents(text):
+    """"R$ 320.000" -> 32000000; "R$ 1.200,50" -> 120050; None se não houver número."""
+    if not text:
+        return None
+    match = PRICE_RE.search(str(text))
+    if not match:
+        return None
+    cents = int(match.group(1).replace(".", "")) * 100
+    if match.group(2):
+        cents += int(match.group(2).ljust(2, "0"))
+    return cents
+
+def parse_area_m2(text):
+    if not text:
+        return None
+    match = AREA_RE.search(str(text))
+    if not match:
+        return None
+    # Formato brasileiro: ponto de milhar, vírgula decimal ("1.000m²", "72,5 m²")
+    return float(match.group(1).replace(".", "").replace(",", "."))
+
+def parse_bedrooms(text):
+    if not text:
+        return None
+    match = BEDROOMS_RE.search(str(text))
+    return int(match.group(1)) if match else None
+
+def parse_neighbourhood(location):
+    """"São Sebastião, Enseada" -> "Enseada" (None se só houver o município)."""
+    if not location:
+        return None
+    parts = [p.strip() for p in re.split(r",| - ", str(location)) if p.strip()]
+    parts = [p for p in parts if p.lower() not in LOCATION_NOISE]
+    return parts[-1] if parts else None
+
+def compress_raw(raw):
+    """JSON compacto + zlib do anúncio bruto (None se não houver)."""
+    if raw is None:
+        return None
+    return zlib.compress(json.dumps(raw, ensure_ascii=False, separators=(",", ":")).encode("utf-8"), 9)
+
+def decompress_raw(blob):
+    if blob is None:
+        return None
+    return json.loads(zlib.decompress(blob).decode("utf-8"))
+
+def normalize_ad(ad):
+    """Colunas numéricas/normalizadas de um anúncio raspado.
+
+    Usa o payload estruturado da OLX (ad["raw"]) quando existe; nos demais sites
+    extrai do texto de preço, título e localização.
+    """
+    raw = ad.get("raw")
+    if raw:
+        props = {p.get("name"): p.get("value") for p in raw.get("properties") or []}
+        details = raw.get("locationDetails") or {}
+        rooms = props.get("rooms")
+        return {
+            "price_cents": parse_price_cents(raw.get("priceValue") or raw.get("price")),
+            "area_m2": parse_area_m2(props.get("size")) or parse_area_m2(raw.get("subject")),
+            "bedrooms": int(rooms) if rooms and str(rooms).isdigit() else parse_bedrooms(raw.get("subject")),
+            "neighbourhood": details.get("neighbourhood") or parse_neighbourhood(raw.get("location")),
+            "list_time": raw.get("origListTime"),
+            "raw": compress_raw(raw),
+        }
+    return {
+        "price_cents": parse_price_cents(ad.get("price")),
+        "area_m2": parse_area_m2(ad.get("title")),
+        "bedrooms": parse_bedrooms(ad.get("title")),
+        "neighbourhood": parse_neighbourhood(ad.get("location")),
+        "list_time": None,
+        "raw": None,
+    }
@@ -0,0 +1,220 @@
+import asyncio
+import html
+import os
+import time
+from datetime import datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from metrics import count
+from retry import backoff_delay
+
+# Apontável para um servidor stub local (testes sem falar com o Telegram de verdade)
+TELEGRAM_API_URL = os.environ.get("TELEGRAM_API_URL", "https://api.telegram.org")
+
+# Limites documentados do Telegram: ~30 msg/s no total, 1 msg/s por chat e 20 msg/min em grupos
+GLOBAL_RATE = 25
+PRIVATE_CHAT_RATE = 1
+GROUP_CHAT_RATE = 20 / 60
+
+# Acima deste número de anúncios pendentes, agrupamos vários por mensagem (digest)
+DIGEST_THRESHOLD = int(os.environ.get("DIGEST_THRESHOLD", "10"))
+DIGEST_SIZE = int(os.environ.get("DIGEST_SIZE", "15"))
+MAX_MESSAGE_LENGTH = 4096
+
+class TokenBucket:
+    """Token bucket assíncrono; pause() congela o balde (ex.: retry_after de um 429)."""
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0
+        self._lock = asyncio.Lock()
+
+    def pause(self, seconds):
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.tokens = 0
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+class TelegramDispatcher:
+    """Fila de envio para o Telegram com workers concorrentes e limites por chat/global.
+
+    Cada item da fila é (chat_id, texto, ids); os ids enviados com sucesso são repassados
+    em lotes para on_sent (ex.: marcar notified = 1 numa única transação).
+    """
+
+    def __init__(self, token, api_url=TELEGRAM_API_URL, workers=4, max_retries=5, mark_batch=50, on_sent=None):
+        self.url = f"{api_url}/bot{token}/sendMessage"
+        self.workers = workers
+        self.max_retries = max_retries
+        self.mark_batch = mark_batch
+        self.on_sent = on_sent
+        self.global_bucket = TokenBucket(GLOBAL_RATE, capacity=GLOBAL_RATE)
+        self.chat_buckets = {}
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=workers))
+        self.session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=workers))
+        self.stats = {"sent": 0, "failed": 0, "retries": 0, "rate_limited": 0}
+        self._pending_ids = []
+
+    def _chat_bucket(self, chat_id):
+        if chat_id not in self.chat_buckets:
+            rate = GROUP_CHAT_RATE if str(chat_id).startswith("-") else PRIVATE_CHAT_RATE
+            self.chat_buckets[chat_id] = TokenBucket(rate)
+        return self.chat_buckets[chat_id]
+
+    def _post(self, payload):
+        response = self.session.post(self.url, json=payload, timeout=30)
+        try:
+            body = response.json()
+        except ValueError:
+            body = {}
+        return response.status_code, body
+
+    async def send(self, chat_id, text):
+        """Envia uma mensagem respeitando os limites; True se o Telegram aceitou."""
+        payload = {"chat_id": chat_id, "text": text, "parse_mode": "HTML", "disable_web_page_preview": False}
+        bucket = self._chat_bucket(chat_id)
+        for attempt in range(self.max_retries + 1):
+            await bucket.acquire()
+            await self.global_bucket.acquire()
+            try:
+                status, body = await asyncio.to_thread(self._post, payload)
+            except requests.RequestException as e:
+                status, body = None, {"description": str(e)}
+            if status == 200 and body.get("ok", True):
+                self.stats["sent"] += 1
+                return True
+            if status == 429:
+                # O Telegram diz exatamente quanto esperar; vale para o chat e para o bot todo
+                retry_after = (body.get("parameters") or {}).get("retry_after", 5)
+                self.stats["rate_limited"] += 1
+                bucket.pause(retry_after)
+                self.global_bucket.pause(retry_after)
+            elif status is not None and status < 500:
+                print(f"Erro Telegram ({status}): {body.get('description')}")
+                break
+            elif attempt < self.max_retries:
+                await asyncio.sleep(backoff_delay(attempt))
+            self.stats["retries"] += 1
+        self.stats["failed"] += 1
+        return False
+
+    def _flush(self):
+        if self._pending_ids and self.on_sent:
+            self.on_sent(self._pending_ids)
+        self._pending_ids = []
+
+    async def _worker(self, queue):
+        while True:
+            chat_id, text, ids = await queue.get()
+            try:
+                if await self.send(chat_id, text):
+                    self._pending_ids.extend(ids)
+                    if len(self._pending_ids) >= self.mark_batch:
+                        self._flush()
+            finally:
+                queue.task_done()
+
+    async def run(self, items):
+        """Despacha todos os itens (chat_id, texto, ids) e devolve as estatísticas."""
+        queue = asyncio.Queue()
+        for item in items:
+            queue.put_nowait(item)
+        workers = [asyncio.create_task(self._worker(queue)) for _ in range(self.workers)]
+        try:
+            await queue.join()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            self._flush()
+        return self.stats
+
+    def close(self):
+        self.session.close()
+
+def format_ad_message(ad):
+    """Mensagem individual (HTML) de um anúncio: dict com title, price, location, url, source_site, ad_type."""
+    icon = "🏢" if ad["ad_type"] == "competitor" else "🏠"
+    header = "CONCORRÊNCIA" if ad["ad_type"] == "competitor" else "NOVO PROPRIETÁRIO"
+
+    message = f"{icon} <b>{header} ({ad['source_site'].upper()})</b>\n\n"
+    message += f"<b>{html.escape(str(ad['title']))}</b>\n"
+    message += f"💰 <b>{ad['price']}</b>\n"
+    message += f"📍 {html.escape(str(ad['location']))}\n\n"
+    message += f"🔗 <a href='{ad['url']}'>Ver anúncio</a>"
+    for dup in ad.get("duplicates") or []:
+        message += f"\n🔁 Também em <a href='{dup['url']}'>{dup['source_site'].upper()}</a>"
+    if ad.get("seen_before"):
+        seen = ad["seen_before"]
+        message += f"\n🔁 Parece o mesmo imóvel já visto em <a href='{seen['url']}'>{seen['source_site'].upper()}</a>"
+    return message
+
+def _ad_ids(ad):
+    return [ad["id"]] + [dup["id"] for dup in ad.get("duplicates") or []]
+
+def format_digest(ads):
+    """Agrupa vários anúncios em mensagens de até DIGEST_SIZE itens / 4096 caracteres.
+
+    Retorna uma lista de (texto, ids).
+    """
+    digests = []
+    lines, ids = [], []
+    header = f"📋 <b>{len(ads)} NOVOS ANÚNCIOS</b>\n"
+    for ad in ads:
+        icon = "🏢" if ad["ad_type"] == "competitor" else "🏠"
+        sources = "/".join(a["source_site"].upper() for a in [ad] + (ad.get("duplicates") or []))
+        line = f"\n{icon} <b>{html.escape(str(ad['title']))}</b> — {ad['price']} ({sources}) <a href='{ad['url']}'>ver</a>"
+        if lines and (len(lines) >= DIGEST_SIZE or len(header) + sum(map(len, lines)) + len(line) > MAX_MESSAGE_LENGTH):
+            digests.append((header + "".join(lines), ids))
+            lines, ids = [], []
+        lines.append(line)
+        ids.extend(_ad_ids(ad))
+    if ids:
+        digests.append((header + "".join(lines), ids))
+    return digests
+
+def build_notifications(ads, chat_id):
+    """Itens para o dispatcher: uma mensagem por anúncio ou digests se a fila for grande."""
+    if len(ads) > DIGEST_THRESHOLD:
+        return [(chat_id, text, ids) for text, ids in format_digest(ads)]
+    return [(chat_id, format_ad_message(ad), _ad_ids(ad)) for ad in ads]
+
+def format_price_drop(event):
+    """Alerta de queda de preço (linha de pending_price_drops)."""
+    message = f"📉 <b>PREÇO CAIU ({event['source_site'].upper()})</b>\n\n"
+    message += f"<b>{html.escape(str(event['title']))}</b>\n"
+    message += f"💰 <s>{event['old_value']}</s> → <b>{event['new_value']}</b>\n"
+    message += f"📍 {html.escape(str(event['location']))}\n\n"
+    message += f"🔗 <a href='{event['url']}'>Ver anúncio</a>"
+    return message
+
+async def dispatch(items, token, on_sent):
+    """Envia os itens (chat_id, texto, ids) e marca os ids enviados via on_sent."""
+    dispatcher = TelegramDispatcher(token, on_sent=on_sent)
+    try:
+        stats = await dispatcher.run(items)
+    finally:
+        dispatcher.close()
+    for name in ("sent", "failed", "retries", "rate_limited"):
+        count(f"telegram_{name}", stats[name])
+    print(f"[{datetime.now().strftime('%H:%M:%S')}] Telegram: {stats['sent']} mensagens enviadas, "
+          f"{stats['failed']} falhas, {stats['rate_limited']} limitadas (429).")
+    return stats
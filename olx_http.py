@@ -0,0 +1,76 @@
+import asyncio
+import json
+import re
+from datetime import datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Só precisamos do <script id="__NEXT_DATA__">: localizamos a tag por regex, sem montar DOM
+NEXT_DATA_RE = re.compile(r'<script[^>]*id=["\']__NEXT_DATA__["\'][^>]*>(.*?)</script>', re.DOTALL)
+NEXT_DATA_START = re.compile(rb'<script[^>]*id=["\']__NEXT_DATA__["\'][^>]*>')
+SCRIPT_END = b"</script>"
+CHUNK_SIZE = 16 * 1024
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "pt-BR,pt;q=0.9,en;q=0.8",
+    "Accept-Encoding": "gzip, deflate",
+}
+
+_session = None
+
+def get_session():
+    """Sessão HTTP compartilhada (keep-alive + pool de conexões + gzip)."""
+    global _session
+    if _session is None:
+        _session = requests.Session()
+        _session.headers.update(HEADERS)
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8)
+        _session.mount("https://", adapter)
+        _session.mount("http://", adapter)
+    return _session
+
+def extract_next_data(html):
+    """Extrai o JSON do __NEXT_DATA__ de um HTML já baixado (ou None)."""
+    match = NEXT_DATA_RE.search(html)
+    if not match:
+        return None
+    return json.loads(match.group(1))
+
+def fetch_next_data(url, timeout=20):
+    """Baixa a página em streaming e para assim que o __NEXT_DATA__ fecha.
+
+    Retorna o JSON ou None quando a resposta parece bloqueada / sem os dados.
+    """
+    with get_session().get(url, stream=True, timeout=timeout) as response:
+        # 403/429/503 = bloqueio antibot ou rate limit: caímos para o Playwright
+        if response.status_code >= 400:
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] OLX HTTP bloqueado ({response.status_code}): {url}")
+            return None
+        buffer = bytearray()
+        found = False
+        for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+            buffer += chunk
+            if not found:
+                match = NEXT_DATA_START.search(buffer)
+                if not match:
+                    # Guarda só o fim do buffer, caso a tag de abertura venha partida entre chunks
+                    del buffer[:-512]
+                    continue
+                del buffer[:match.end()]
+                found = True
+            end = buffer.find(SCRIPT_END)
+            if end >= 0:
+                return json.loads(buffer[:end])
+    print(f"[{datetime.now().strftime('%H:%M:%S')}] OLX HTTP sem __NEXT_DATA__ (provável desafio antibot): {url}")
+    return None
+
+async def fetch_next_data_async(url, timeout=20):
+    """Versão assíncrona de fetch_next_data; erros de rede viram None (fallback)."""
+    try:
+        return await asyncio.to_thread(fetch_next_data, url, timeout)
+    except Exception as e:
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] OLX HTTP falhou ({e}): {url}")
+        return None
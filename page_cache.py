@@ -0,0 +1,112 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+# Por quanto tempo uma página "igual à anterior" pode dispensar o parse; depois disso
+# ela é reprocessada por inteiro mesmo sem mudança (rede de segurança do cache)
+PAGE_CACHE_MAX_AGE = int(os.environ.get("PAGE_CACHE_MAX_AGE", str(6 * 3600)))
+# Entradas não consultadas há mais que isso são apagadas
+PAGE_CACHE_EXPIRE = int(os.environ.get("PAGE_CACHE_EXPIRE", str(7 * 24 * 3600)))
+# Teto de URLs no cache (as consultadas há mais tempo saem primeiro)
+PAGE_CACHE_MAX_ENTRIES = int(os.environ.get("PAGE_CACHE_MAX_ENTRIES", "500"))
+
+def cache_file_for(db_file):
+    """O cache mora ao lado do banco: olx_imoveis.db -> olx_imoveis.cache.db."""
+    return f"{os.path.splitext(db_file)[0]}.cache.db"
+
+def block_hash(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+class PageCache:
+    """Cache de revalidação por URL: ETag/Last-Modified e hash do bloco de anúncios.
+
+    Fica num SQLite separado (não entra no .db versionado). Se a página não mudou,
+    o motor pula page.content(), o parse e o diff no banco, e só renova o last_seen
+    dos anúncios que a página tinha (ad_ids).
+
+    O GET condicional só compensa se o servidor responde 304: um 200 baixa o documento
+    duas vezes (GET + goto). Depois do primeiro 200 a URL fica com honours_304 = 0 e
+    passa a depender só do hash do bloco de cards.
+    """
+
+    def __init__(self, cache_file):
+        self.conn = sqlite3.connect(cache_file)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS page_cache (
+                url TEXT PRIMARY KEY,
+                site TEXT,
+                etag TEXT,
+                last_modified TEXT,
+                content_hash TEXT,
+                ad_ids TEXT,
+                size_bytes INTEGER,
+                fetched_at REAL,
+                checked_at REAL,
+                hits INTEGER DEFAULT 0,
+                honours_304 BOOLEAN DEFAULT 1
+            )
+        ''')
+        columns = [column[1] for column in self.conn.execute("PRAGMA table_info(page_cache)")]
+        if "honours_304" not in columns:
+            self.conn.execute("ALTER TABLE page_cache ADD COLUMN honours_304 BOOLEAN DEFAULT 1")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_page_cache_checked ON page_cache (checked_at)")
+        self.evict()
+
+    def get(self, url):
+        """Entrada ainda válida para a URL, ou None (inexistente ou velha demais)."""
+        row = self.conn.execute("SELECT etag, last_modified, content_hash, ad_ids, fetched_at, honours_304 FROM page_cache WHERE url = ?", (url,)).fetchone()
+        if row is None or time.time() - row[4] > PAGE_CACHE_MAX_AGE:
+            return None
+        return {"etag": row[0], "last_modified": row[1], "content_hash": row[2], "ad_ids": json.loads(row[3] or "[]"), "honours_304": bool(row[5])}
+
+    def conditional_headers(self, entry):
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def put(self, url, site, headers, content_hash, ad_ids, size_bytes):
+        """Grava a versão recém-processada da página (headers = resposta do documento)."""
+        now = time.time()
+        headers = headers or {}
+        with self.conn:
+            self.conn.execute('''
+                INSERT INTO page_cache (url, site, etag, last_modified, content_hash, ad_ids, size_bytes, fetched_at, checked_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(url) DO UPDATE SET
+                    site = excluded.site, etag = excluded.etag, last_modified = excluded.last_modified,
+                    content_hash = excluded.content_hash, ad_ids = excluded.ad_ids, size_bytes = excluded.size_bytes,
+                    fetched_at = excluded.fetched_at, checked_at = excluded.checked_at
+            ''', (url, site, headers.get("etag"), headers.get("last-modified"), content_hash,
+                  json.dumps([str(i) for i in ad_ids]), size_bytes, now, now))
+
+    def ignores_304(self, url):
+        """O GET condicional voltou 200: a URL não é mais revalidada assim (só pelo hash)."""
+        with self.conn:
+            self.conn.execute("UPDATE page_cache SET honours_304 = 0 WHERE url = ?", (url,))
+
+    def touch(self, url):
+        """Página revalidada sem mudança: conta o acerto (fetched_at fica, para o MAX_AGE valer)."""
+        with self.conn:
+            self.conn.execute("UPDATE page_cache SET checked_at = ?, hits = hits + 1 WHERE url = ?", (time.time(), url))
+
+    def evict(self):
+        """Remove entradas expiradas e, acima do teto, as consultadas há mais tempo."""
+        with self.conn:
+            self.conn.execute("DELETE FROM page_cache WHERE checked_at < ?", (time.time() - PAGE_CACHE_EXPIRE,))
+            self.conn.execute('''
+                DELETE FROM page_cache WHERE url IN (
+                    SELECT url FROM page_cache ORDER BY checked_at DESC LIMIT -1 OFFSET ?
+                )
+            ''', (PAGE_CACHE_MAX_ENTRIES,))
+
+    def close(self):
+        self.evict()
+        self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        self.conn.close()
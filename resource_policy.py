@@ -0,0 +1,55 @@
+import os
+from datetime import datetime
+from urllib.parse import urlsplit
+
+# Só lemos HTML / JSON embutido: imagens, fontes, mídia e CSS nunca são necessários
+DEFAULT_ALLOWED_TYPES = {"document", "script", "xhr", "fetch"}
+
+# Analytics, anúncios e rastreadores de terceiros (bloqueados por sufixo de domínio)
+TRACKER_DOMAINS = (
+    "google-analytics.com", "googletagmanager.com", "doubleclick.net", "googlesyndication.com",
+    "googleadservices.com", "adservice.google.com", "facebook.net", "facebook.com",
+    "hotjar.com", "clarity.ms", "tiktok.com", "criteo.com", "criteo.net", "taboola.com", "outbrain.com",
+    "newrelic.com", "nr-data.net", "segment.io", "amplitude.com", "onesignal.com", "rdstation.com.br",
+    "hubspot.com", "zopim.com", "jivosite.com",
+)
+
+# RESOURCE_BLOCKING=0 desliga o bloqueio mas mantém a contagem: serve de linha de base
+# para medir quantos bytes/requisições o bloqueio economiza.
+RESOURCE_BLOCKING = os.environ.get("RESOURCE_BLOCKING", "1") == "1"
+
+def _is_blocked_domain(url, blocked_domains):
+    host = urlsplit(url).hostname or ""
+    return any(host == domain or host.endswith("." + domain) for domain in blocked_domains)
+
+async def install_resource_policy(context, policy):
+    """Instala o bloqueio de recursos (o "resources" do site) no contexto e devolve o dict de estatísticas."""
+    policy = policy or {"allowed_types": DEFAULT_ALLOWED_TYPES, "blocked_domains": TRACKER_DOMAINS}
+    stats = {"requests": 0, "blocked": 0, "blocked_by_type": {}, "bytes_loaded": 0}
+
+    async def handle_route(route):
+        request = route.request
+        if request.resource_type not in policy["allowed_types"] or _is_blocked_domain(request.url, policy["blocked_domains"]):
+            stats["blocked"] += 1
+            stats["blocked_by_type"][request.resource_type] = stats["blocked_by_type"].get(request.resource_type, 0) + 1
+            await route.abort()
+        else:
+            await route.continue_()
+
+    async def on_request_finished(request):
+        stats["requests"] += 1
+        try:
+            sizes = await request.sizes()
+            stats["bytes_loaded"] += sizes["responseBodySize"] + sizes["responseHeadersSize"]
+        except Exception:
+            pass
+
+    if RESOURCE_BLOCKING:
+        await context.route("**/*", handle_route)
+    context.on("requestfinished", on_request_finished)
+    return stats
+
+def log_resource_stats(name, stats):
+    by_type = ", ".join(f"{k}={v}" for k, v in sorted(stats["blocked_by_type"].items())) or "-"
+    print(f"[{datetime.now().strftime('%H:%M:%S')}] Recursos {name}: {stats['requests']} baixados, "
+          f"{stats['blocked']} bloqueados ({by_type}), {stats['bytes_loaded'] / 1024:.0f} KB.")
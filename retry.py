@@ -0,0 +1,6 @@
+"""Espera entre tentativas: backoff exponencial com jitter (notifier, drafting e scheduler)."""
+import random
+
+def backoff_delay(attempt, base=1, cap=60):
+    """Segundos antes da próxima tentativa: base * 2^attempt (no máximo cap) mais até 1s de jitter."""
+    return min(cap, base * 2 ** attempt) + random.random()
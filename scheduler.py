@@ -0,0 +1,63 @@
+import asyncio
+import os
+import time
+from datetime import datetime
+
+from metrics import count, span
+from resource_policy import log_resource_stats
+from retry import backoff_delay
+
+# Novas tentativas de um site que falhou (erro ou crash; timeout não repete) e a espera base entre elas
+SITE_RETRIES = int(os.environ.get("SITE_RETRIES", "2"))
+SITE_RETRY_BACKOFF = float(os.environ.get("SITE_RETRY_BACKOFF", "5"))
+
+async def run_site(pool, semaphore, site, scrape, timeout, retries=SITE_RETRIES):
+    """Roda um único site numa página do pool, com timeout, isolamento de erros e retry com backoff."""
+    name = site["label"]
+    for attempt in range(retries + 1):
+        retryable = True
+        async with semaphore:
+            started = time.monotonic()
+            try:
+                async with pool.lease(site) as (page, resource_stats):
+                    try:
+                        with span("site_total", site["name"]):
+                            ads = await asyncio.wait_for(scrape(page, site), timeout=timeout)
+                        # O motor engole erros por página: se a página caiu no meio, o resultado está incompleto
+                        if pool.broken(site["name"]):
+                            raise RuntimeError("a página ou o browser caiu durante a raspagem")
+                    finally:
+                        log_resource_stats(name, resource_stats)
+                        count("requests", resource_stats["requests"], site=site["name"])
+                        count("blocked_requests", resource_stats["blocked"], site=site["name"])
+                        count("bytes_loaded", resource_stats["bytes_loaded"], site=site["name"])
+                print(f"[{datetime.now().strftime('%H:%M:%S')}] {name}: {len(ads)} anúncios em {time.monotonic() - started:.1f}s.")
+                pool.record(site["name"], True, retry=attempt > 0)
+                return site["name"], ads
+            except asyncio.TimeoutError:
+                count("timeouts", site=site["name"])
+                print(f"[{datetime.now().strftime('%H:%M:%S')}] Timeout {name}: abortado após {timeout}s.")
+                retryable = False
+            except Exception as e:
+                count("errors", site=site["name"])
+                print(f"[{datetime.now().strftime('%H:%M:%S')}] Erro crítico {name}: {e}")
+        pool.record(site["name"], False, retry=attempt > 0)
+        if not retryable or attempt == retries:
+            break
+        # Fora do semáforo: a espera não segura a vaga de outro site
+        delay = backoff_delay(attempt, SITE_RETRY_BACKOFF)
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] {name}: nova tentativa em {delay:.0f}s ({attempt + 1}/{retries}).")
+        await asyncio.sleep(delay)
+    return site["name"], None
+
+async def run_sites(pool, sites, scrape, max_concurrency=3, timeout=180):
+    """Roda scrape(page, site) para todos os sites em paralelo (limitado por max_concurrency) no pool.
+
+    Retorna {site["name"]: lista_de_anúncios}; sites que falharam (mesmo após os retries)
+    ou estouraram o timeout aparecem com None, sem atrapalhar os demais.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+    started = time.monotonic()
+    results = await asyncio.gather(*(run_site(pool, semaphore, site, scrape, timeout) for site in sites))
+    print(f"[{datetime.now().strftime('%H:%M:%S')}] Raspagem paralela concluída em {time.monotonic() - started:.1f}s ({len(sites)} sites, até {max_concurrency} simultâneos).")
+    return dict(results)
@@ -0,0 +1,138 @@
+"""Modo de armazenamento em segmentos incrementais (STORAGE_MODE=segments).
+
+Em vez de versionar o olx_imoveis.db inteiro a cada rodada, cada rodada grava só as
+linhas novas/alteradas num segmento append-only comprimido em SEGMENTS_DIR
+(AAAAMMDDTHHMMSSffffff.jsonl.gz). O .db versionado vira a base compactada:
+
+    início da rodada   apply_segments()  -> aplica na base os segmentos ainda não aplicados
+                       start_capture()   -> triggers TEMP anotam as chaves alteradas
+    fim da rodada      write_segment()   -> despeja as linhas anotadas num segmento novo
+                       compact()         -> a cada SEGMENT_COMPACT_EVERY segmentos, VACUUM
+                                            na base e apaga os segmentos (só então o .db muda)
+
+Linhas: {"t": tabela, "op": "upsert", "row": {...}} ou {"t": tabela, "op": "delete", "pk": [...]};
+BLOBs vão como {"$b64": "..."}. python check_segments.py confere o ciclo offline.
+"""
+import base64
+import glob
+import gzip
+import json
+import os
+from datetime import datetime, timezone
+
+SEGMENTS_DIR = os.environ.get("SEGMENTS_DIR", "segments")
+SEGMENT_COMPACT_EVERY = int(os.environ.get("SEGMENT_COMPACT_EVERY", "30"))
+
+# Tabelas versionadas -> colunas da chave primária. dedup_keys fica de fora: é derivada de
+# imoveis (~30 chaves por anúncio) e dedup.ensure_dedup_index a completa no início da rodada
+TRACKED_TABLES = {
+    "imoveis": ("id",),
+    "listing_snapshots": ("id",),
+    "listing_events": ("event_id",),
+    "listing_duplicates": ("listing_id",),
+    "crawl_state": ("key",),
+    "drafts": ("listing_id",),
+}
+
+def _encode(value):
+    return {"$b64": base64.b64encode(value).decode("ascii")} if isinstance(value, bytes) else value
+
+def _decode(value):
+    return base64.b64decode(value["$b64"]) if isinstance(value, dict) and "$b64" in value else value
+
+def segment_files(directory=None):
+    return sorted(glob.glob(os.path.join(directory or SEGMENTS_DIR, "*.jsonl.gz")))
+
+def apply_segments(conn, directory=None):
+    """Aplica, em ordem, os segmentos que esta base ainda não conhece. Devolve quantos."""
+    applied = {row[0] for row in conn.execute("SELECT name FROM applied_segments")}
+    count = 0
+    for path in segment_files(directory):
+        name = os.path.basename(path)
+        if name in applied:
+            continue
+        rows = 0
+        with conn:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    record = json.loads(line)
+                    table = record.get("t")
+                    if table not in TRACKED_TABLES:
+                        continue  # cabeçalho ou tabela que esta versão não conhece
+                    pk = TRACKED_TABLES[table]
+                    if record["op"] == "delete":
+                        where = " AND ".join(f"{c} = ?" for c in pk)
+                        conn.execute(f"DELETE FROM {table} WHERE {where}", record["pk"])
+                    else:
+                        row = record["row"]
+                        columns = list(row)
+                        conn.execute(f"INSERT OR REPLACE INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                                     [_decode(row[c]) for c in columns])
+                    rows += 1
+            conn.execute("INSERT INTO applied_segments (name, applied_at) VALUES (?, ?)", (name, datetime.now().isoformat(sep=" ")))
+        count += 1
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] Segmento {name} aplicado ({rows} linhas).")
+    return count
+
+def start_capture(conn):
+    """Triggers TEMP (não vão para o arquivo) anotando a chave de cada linha inserida, alterada ou apagada.
+
+    O corpo usa ON CONFLICT DO NOTHING e não INSERT OR IGNORE: dentro de um trigger o OR
+    IGNORE é trocado pela política do comando externo, e um UPSERT numa linha já anotada
+    estouraria a UNIQUE de segment_changes.
+    """
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS segment_changes (tbl TEXT, pk TEXT, PRIMARY KEY (tbl, pk))")
+    for table, pk in TRACKED_TABLES.items():
+        for event, ref in (("INSERT", "NEW"), ("UPDATE", "NEW"), ("DELETE", "OLD")):
+            key = f"json_array({', '.join(f'{ref}.{c}' for c in pk)})"
+            conn.execute(f'''
+                CREATE TEMP TRIGGER IF NOT EXISTS segment_{table}_{event.lower()} AFTER {event} ON main.{table}
+                BEGIN INSERT INTO segment_changes (tbl, pk) VALUES ('{table}', {key}) ON CONFLICT DO NOTHING; END
+            ''')
+
+def write_segment(conn, directory=None):
+    """Grava as linhas anotadas desde start_capture() num segmento novo. Devolve o caminho (ou None)."""
+    directory = directory or SEGMENTS_DIR
+    changes = conn.execute("SELECT tbl, pk FROM temp.segment_changes ORDER BY tbl").fetchall()
+    if not changes:
+        return None
+    os.makedirs(directory, exist_ok=True)
+    name = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f") + ".jsonl.gz"
+    path = os.path.join(directory, name)
+    tmp = f"{path}.tmp"
+    with gzip.open(tmp, "wt", encoding="utf-8", compresslevel=9) as f:
+        f.write(json.dumps({"segment": name, "created_at": datetime.now().isoformat(sep=" "), "rows": len(changes)}) + "\n")
+        for table, pk_json in changes:
+            pk = TRACKED_TABLES[table]
+            values = json.loads(pk_json)
+            where = " AND ".join(f"{c} = ?" for c in pk)
+            cursor = conn.execute(f"SELECT * FROM {table} WHERE {where}", values)
+            row = cursor.fetchone()
+            if row is None:
+                record = {"t": table, "op": "delete", "pk": values}
+            else:
+                columns = [c[0] for c in cursor.description]
+                record = {"t": table, "op": "upsert", "row": {c: _encode(v) for c, v in zip(columns, row)}}
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    os.replace(tmp, path)
+    with conn:
+        # O segmento saiu desta base: não pode ser reaplicado nela
+        conn.execute("INSERT INTO applied_segments (name, applied_at) VALUES (?, ?)", (name, datetime.now().isoformat(sep=" ")))
+        conn.execute("DELETE FROM temp.segment_changes")
+    print(f"[{datetime.now().strftime('%H:%M:%S')}] Segmento {name}: {len(changes)} linhas, {os.path.getsize(path) / 1024:.1f} KB.")
+    return path
+
+def compact(conn, directory=None, every=None):
+    """Com segmentos demais, consolida: VACUUM na base (que já tem tudo aplicado) e apaga os segmentos."""
+    files = segment_files(directory)
+    if len(files) < (every or SEGMENT_COMPACT_EVERY):
+        return False
+    # Primeiro a base fica completa e enxuta; se cair antes de apagar, applied_segments evita reaplicar
+    conn.commit()
+    conn.execute("VACUUM")
+    for path in files:
+        os.remove(path)
+    with conn:
+        conn.execute("DELETE FROM applied_segments")
+    print(f"[{datetime.now().strftime('%H:%M:%S')}] Compactação: {len(files)} segmentos consolidados na base.")
+    return True
@@ -0,0 +1,157 @@
+"""Registro declarativo dos portais monitorados.
+
+Cada site é só configuração: URL, paginação, seletor de prontidão, seletores de
+campos, regra de ID, ad_type e se está ativo. O motor genérico (engine.scrape_site)
+roda todos pelo mesmo caminho. Para um portal novo basta register_site({...}).
+
+Campos de "fields": lista de seletores CSS tentados em ordem; ("contains", tag, texto)
+pega o primeiro <tag> cujo texto contém `texto`; "link": None indica que o próprio
+card é o <a>.
+"""
+import os
+
+from resource_policy import DEFAULT_ALLOWED_TYPES, TRACKER_DOMAINS
+
+SITE_DEFAULTS = {
+    "enabled": True,
+    "kind": "cards",  # "cards" (seletores CSS) ou "next_data" (JSON embutido da OLX)
+    "ad_type": "competitor",
+    "pagination": None,  # None = página única
+    "max_pages": 1,
+    # Intervalo entre raspagens no modo daemon (segundos); SITE_INTERVAL_<NAME> sobrescreve
+    "interval": 1800,
+    "ready": None,
+    "resources": {"allowed_types": DEFAULT_ALLOWED_TYPES, "blocked_domains": TRACKER_DOMAINS},
+    "parser_backend": None,
+    # Pula parse e diff quando a listagem não mudou (page_cache.py); PAGE_CACHE=0 desliga tudo
+    "page_cache": True,
+    "id": {"prefix": "", "strip_query": True, "fallback_on": []},
+    "defaults": {"price": "Consulte", "location": "São Sebastião", "category": "Venda"},
+}
+
+_OLX = {
+    "source_site": "olx",
+    "fixture": "olx",
+    "kind": "next_data",
+    "http_fast_path": True,
+    # O payload da OLX muda a cada acesso (lastBumpAgeSecs) e alimenta o histórico de preço
+    "page_cache": False,
+    # Paginação adaptativa: para quando a página só traz anúncios já vistos (ou mais antigos que a última rodada)
+    "pagination": {"type": "query", "param": "o"},
+    "max_pages": int(os.environ.get("OLX_MAX_PAGES", "10")),
+    "ready": {"selector": "script#__NEXT_DATA__", "timeout": 10000},
+    "resources": {"allowed_types": DEFAULT_ALLOWED_TYPES, "blocked_domains": TRACKER_DOMAINS + ("img.olx.com.br",)},
+}
+
+_SITES = [
+    # Proprietários são os leads mais disputados: no daemon, a busca roda a cada 5 min
+    dict(_OLX, name="olx-owner", label="OLX Owners", ad_type="owner", interval=300,
+         url="https://www.olx.com.br/imoveis/estado-sp/vale-do-paraiba-e-litoral-norte/sao-sebastiao?f=p"),
+    dict(_OLX, name="olx-professional", label="OLX Professional", ad_type="competitor",
+         url="https://www.olx.com.br/imoveis/estado-sp/vale-do-paraiba-e-litoral-norte/sao-sebastiao?f=c"),
+    {
+        "name": "riviera",
+        "label": "Riviera",
+        "source_site": "riviera",
+        "url": "https://www.rivieraimoveis.com/imobiliaria/venda/sao-sebastiao-sp/imoveis/364/1",
+        "base_url": "https://www.rivieraimoveis.com",
+        # Site pesado: renderiza os cards aos poucos
+        "ready": {"selector": "article.c49-property-card", "timeout": 20000, "network_idle": 3000},
+        "cards": "article.c49-property-card",
+        "fields": {
+            "link": ["a.c49btn-details"],
+            "title": ["h2", ".c49-property-card_title"],
+            "price": [".c49-property-card_rent-price", ("contains", "div", "R$")],
+            "location": [".c49-property-card_address", ".c49-property-card_header div"],
+        },
+        # Último segmento da URL; se for vazio ou "1", usa o penúltimo
+        "id": {"prefix": "riv-", "strip_query": True, "fallback_on": ["", "1"]},
+    },
+    {
+        "name": "iz",
+        "label": "IZ Imóveis",
+        "source_site": "iz",
+        "url": "https://www.izimoveis.com.br/imoveis/a-venda/sao-sebastiao",
+        "base_url": "https://www.izimoveis.com.br",
+        "ready": {"selector": "a.card-with-buttons", "timeout": 10000},
+        "cards": "a.card-with-buttons",
+        "fields": {
+            "link": None,
+            "title": ["h2", ".card-with-buttons__title"],
+            "price": [".card-with-buttons__value"],
+            "location": [],
+        },
+        "id": {"prefix": "iz-", "strip_query": True, "fallback_on": []},
+    },
+    {
+        "name": "tropical",
+        "label": "Tropical",
+        "source_site": "tropical",
+        # Desativado temporariamente - Bloqueio antibot forte (SITES_ENABLED=tropical reativa)
+        "enabled": False,
+        "url": "https://tropicalimobiliaria.com.br/comprar/sp/sao-sebastiao/pagina-1/",
+        "pagination": {"type": "template", "template": "https://tropicalimobiliaria.com.br/comprar/sp/sao-sebastiao/pagina-{page}/"},
+        "base_url": "https://tropicalimobiliaria.com.br",
+        "ready": {"selector": "a.link_resultado", "timeout": 10000},
+        "cards": "a.link_resultado",
+        "fields": {
+            "link": None,
+            "title": ["h3"],
+            "price": ["h5"],
+            "location": [".final_card"],
+        },
+        "id": {"prefix": "trop-", "strip_query": False, "fallback_on": [""]},
+    },
+    {
+        "name": "adimov",
+        "label": "Adimov",
+        "source_site": "adimov",
+        "url": "https://www.adimov.com.br/imobiliaria/imoveis",
+        "base_url": "https://www.adimov.com.br",
+        "ready": {"selector": "article.c49-property-card", "timeout": 15000, "network_idle": 2000},
+        "cards": "article",
+        "fields": {
+            "link": ["a.c49btn-details"],
+            "title": [".c49-property-card_header h2", "h2"],
+            "price": [".c49-property-card_price"],
+            "location": [],
+        },
+        "id": {"prefix": "adi-", "strip_query": True, "fallback_on": []},
+    },
+]
+
+def _with_defaults(config):
+    site = dict(SITE_DEFAULTS)
+    site.update(config)
+    site.setdefault("label", site["name"])
+    site.setdefault("fixture", site["name"])
+    return site
+
+SITES = [_with_defaults(config) for config in _SITES]
+
+def register_site(config):
+    """Adiciona (ou substitui, pelo name) um portal no registro."""
+    site = _with_defaults(config)
+    SITES[:] = [s for s in SITES if s["name"] != site["name"]] + [site]
+    return site
+
+def get_site(name):
+    for site in SITES:
+        if site["name"] == name:
+            return site
+    raise KeyError(name)
+
+def _env_list(name):
+    return {item.strip() for item in os.environ.get(name, "").split(",") if item.strip()}
+
+def enabled_sites():
+    """Sites ativos; SITES_ENABLED / SITES_DISABLED (nomes ou source_site) sobrescrevem a config."""
+    forced_on, forced_off = _env_list("SITES_ENABLED"), _env_list("SITES_DISABLED")
+    active = []
+    for site in SITES:
+        keys = {site["name"], site["source_site"]}
+        if keys & forced_off:
+            continue
+        if site["enabled"] or keys & forced_on:
+            active.append(site)
+    return active
@@ -0,0 +1,100 @@
+import sqlite3
+from datetime import datetime
+
+from normalize import normalize_ad
+
+# Limite de parâmetros por SELECT ... IN (SQLite antigo aceita no máximo 999)
+IN_CHUNK = 900
+
+def select_in(conn, sql, values):
+    """Roda sql em lotes de IN_CHUNK valores ({placeholders} vira os "?" do IN) e junta as linhas."""
+    values = list(values)
+    rows = []
+    for start in range(0, len(values), IN_CHUNK):
+        chunk = values[start:start + IN_CHUNK]
+        rows.extend(conn.execute(sql.format(placeholders=",".join("?" * len(chunk))), chunk))
+    return rows
+
+class ImovelStore:
+    """Conexão SQLite de longa duração com cache em memória dos IDs já salvos.
+
+    Uma única conexão (WAL) é reaproveitada pela rodada inteira; cada lote raspado é
+    checado contra o cache e, para o que faltar, com um único SELECT ... IN, e os
+    novos anúncios entram numa só transação.
+    """
+
+    def __init__(self, db_file):
+        self.db_file = db_file
+        self.conn = sqlite3.connect(db_file)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA temp_store=MEMORY")
+        self.conn.execute("PRAGMA cache_size=-16000")
+        self._seen = set()
+
+    def seen_ids(self, ids):
+        """Quais destes IDs já estão no banco (consulta só os que o cache não conhece)."""
+        ids = {str(i) for i in ids}
+        rows = select_in(self.conn, "SELECT id FROM imoveis WHERE id IN ({placeholders})", ids - self._seen)
+        self._seen.update(row[0] for row in rows)
+        return ids & self._seen
+
+    def save_new(self, ads, source_site, ad_type):
+        """Insere só os anúncios inéditos e devolve a lista deles."""
+        seen = self.seen_ids(ad.get("id") for ad in ads)
+        now = datetime.now().isoformat(sep=" ")
+        new_ads, rows = [], []
+        for ad in ads:
+            list_id = str(ad.get("id"))
+            if list_id in seen:
+                continue
+            seen.add(list_id)
+            new_ads.append(ad)
+            norm = normalize_ad(ad)
+            rows.append((list_id, ad.get("title"), ad.get("price"), ad.get("url"), ad.get("category"), ad.get("location"), source_site, ad_type, now,
+                         norm["price_cents"], norm["area_m2"], norm["bedrooms"], norm["neighbourhood"], norm["list_time"], norm["raw"]))
+        if rows:
+            with self.conn:
+                self.conn.executemany('''
+                    INSERT INTO imoveis (id, title, price, url, category, location, source_site, ad_type, date_added, notified,
+                                         price_cents, area_m2, bedrooms, neighbourhood, list_time, raw)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 0, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(id) DO NOTHING
+                ''', rows)
+            self._seen.update(row[0] for row in rows)
+        return new_ads
+
+    def find_listings(self, ad_type=None, neighbourhood=None, max_price_cents=None, min_price_cents=None, min_area_m2=None, min_bedrooms=None, source_site=None, limit=100):
+        """Consulta filtrada (coberta por idx_imoveis_filter), ex.: donos em Enseada até R$ X.
+
+        Retorna dicts com as colunas normalizadas, do anúncio mais novo para o mais antigo.
+        """
+        clauses, params = [], []
+        for column, op, value in (("ad_type", "=", ad_type), ("neighbourhood", "=", neighbourhood),
+                                  ("price_cents", "<=", max_price_cents), ("price_cents", ">=", min_price_cents),
+                                  ("area_m2", ">=", min_area_m2), ("bedrooms", ">=", min_bedrooms), ("source_site", "=", source_site)):
+            if value is not None:
+                clauses.append(f"{column} {op} ?")
+                params.append(value)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        cursor = self.conn.execute(f'''
+            SELECT id, title, price, url, location, source_site, ad_type, price_cents, area_m2, bedrooms, neighbourhood, list_time
+            FROM imoveis {where}
+            ORDER BY COALESCE(list_time, CAST(strftime('%s', date_added) AS INTEGER)) DESC
+            LIMIT ?
+        ''', params + [limit])
+        columns = [c[0] for c in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor]
+
+    def get_state(self, key, default=None):
+        row = self.conn.execute("SELECT value FROM crawl_state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_state(self, key, value):
+        with self.conn:
+            self.conn.execute("INSERT INTO crawl_state (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value", (key, str(value)))
+
+    def close(self):
+        # Consolida o WAL no arquivo principal (o .db é versionado no GitHub)
+        self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        self.conn.close()
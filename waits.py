@@ -0,0 +1,30 @@
+import time
+from datetime import datetime
+
+async def wait_until_ready(page, name, profile):
+    """Espera o conteúdo do site ficar pronto (seletor + rede ociosa), respeitando o teto.
+
+    profile vem do "ready" do site (sites.py): "selector" é o que significa "pronto",
+    "timeout" o teto (ms) e "network_idle" (opcional) um teto extra para a rede acalmar
+    depois do primeiro card, em sites que renderizam a lista aos poucos.
+    Nunca levanta exceção: se o teto estourar, segue com o que já carregou.
+    Retorna True se o seletor de prontidão apareceu.
+    """
+    if not profile:
+        return True
+    started = time.monotonic()
+    ready = True
+    try:
+        # "attached" basta: só lemos o HTML, não precisamos que o elemento esteja visível
+        await page.wait_for_selector(profile["selector"], state="attached", timeout=profile["timeout"])
+    except Exception:
+        ready = False
+    if ready and profile.get("network_idle"):
+        try:
+            await page.wait_for_load_state("networkidle", timeout=profile["network_idle"])
+        except Exception:
+            pass
+    elapsed = time.monotonic() - started
+    status = "pronto" if ready else f"teto de {profile['timeout'] / 1000:.0f}s atingido"
+    print(f"[{datetime.now().strftime('%H:%M:%S')}] Espera {name}: {elapsed:.2f}s ({status}).")
+    return ready